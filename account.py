@@ -1,21 +1,17 @@
 import streamlit as st
 import firebase_admin
 from firebase_admin import credentials, auth
-import json
-import requests
+import mysql.connector
 from dotenv import load_dotenv
 import os
 import logging
 from pathlib import Path
-import mysql.connector
-
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="0819",
-        database="lawyers"
-    )
+import chains
+import db
+import firebase_auth
+import auth_session
+import auth_cookie
+import lawyers
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -150,15 +146,28 @@ def sign_up_with_email_and_password(email, password, username=None):
     try:
         if not init_firebase():
             return False
-        user = auth.create_user(email=email, password=password, display_name=username)
+        # Claim the username before creating the Firebase account: the unique index on users.name
+        # rejects a taken name, and a failed signup never leaves an account without a profile row
+        try:
+            db.execute("INSERT INTO users (name) VALUES (%s)", (username,))
+        except mysql.connector.IntegrityError:
+            st.error("This username is already taken. Please choose another one.")
+            return False
+        try:
+            user = auth.create_user(email=email, password=password, display_name=username)
+        except Exception:
+            db.execute("DELETE FROM users WHERE name = %s", (username,))
+            raise
         logger.info(f"User created successfully: {email}")
         st.success('Account created successfully!')
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users VALUES(%s, NULL, NULL, NULL, NULL, NULL, NULL);", (username,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        lawyers.invalidate(username)
+        # Sign in once over REST so the new session has tokens to keep alive
+        try:
+            status, data = firebase_auth.get_client(api_key).sign_in_with_password(email, password)
+            if status == 200:
+                auth_session.start(st.session_state, data)
+        except Exception as e:
+            logger.warning(f"Could not start token session after signup: {e}")
         st.session_state.username = username
         st.session_state.useremail = email
         st.session_state.authenticated = True
@@ -182,15 +191,13 @@ def sign_in_with_email_and_password(email, password):
         st.error("Email and password are required.")
         return False
     try:
-        rest_api_url = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword"
-        payload = {"email": email, "password": password, "returnSecureToken": True}
-        r = requests.post(rest_api_url, params={"key": api_key}, data=json.dumps(payload))
-        data = r.json()
+        _, data = firebase_auth.get_client(api_key).sign_in_with_password(email, password)
         if 'email' in data:
             logger.info(f"User logged in successfully: {email}")
             st.session_state.username = data.get('displayName', 'User')
             st.session_state.useremail = data['email']
             st.session_state.authenticated = True
+            auth_session.start(st.session_state, data)
             st.switch_page("pages/home.py")
             return True
         else:
@@ -214,14 +221,12 @@ def reset_password(email):
     if not email:
         return False, "Email address is required."
     try:
-        rest_api_url = "https://identitytoolkit.googleapis.com/v1/accounts:sendOobCode"
-        payload = {"email": email, "requestType": "PASSWORD_RESET"}
-        r = requests.post(rest_api_url, params={"key": api_key}, data=json.dumps(payload))
-        if r.status_code == 200:
+        status, data = firebase_auth.get_client(api_key).send_password_reset(email)
+        if status == 200:
             logger.info(f"Password reset email sent to: {email}")
             return True, "Password reset email sent successfully."
         else:
-            error_message = r.json().get('error', {}).get('message', 'Unknown error')
+            error_message = data.get('error', {}).get('message', 'Unknown error')
             logger.error(f"Password reset failed: {error_message}")
             if "EMAIL_NOT_FOUND" in error_message:
                 return False, "Email not found."
@@ -282,7 +287,9 @@ def auth_page():
         st.markdown('</div>', unsafe_allow_html=True)
 
 def main():
-    if st.session_state.get('authenticated', False):
+    # Start building the Gemini chains while the user logs in
+    chains.warm_up()
+    if auth_cookie.keep_alive(st.session_state):
         st.switch_page("pages/home.py")
     else:
         auth_page()
@@ -0,0 +1,245 @@
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+import document_analysis
+import pdf_extract
+from reports import REPORT_FORMATS, json_to_text
+
+CORPUS_WORKERS = int(os.getenv("CORPUS_WORKERS", "4"))
+CORPUS_EXTRACT_WORKERS = int(os.getenv("CORPUS_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+
+# PDFs under root in a stable order, yielded lazily so huge corpora start processing at once.
+# Directories in exclude (e.g. a reports directory inside the corpus) are not descended into.
+def iter_pdfs(root, exclude=()):
+    entries = sorted(os.scandir(root), key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if os.path.realpath(entry.path) not in exclude:
+                yield from iter_pdfs(entry.path, exclude)
+        elif entry.is_file() and entry.name.lower().endswith(".pdf"):
+            yield entry.path
+
+
+# Paths already recorded in the output file. A run that crashed part way leaves every finished
+# document behind as one complete line; a torn last line is ignored and that file redone.
+def load_checkpoint(output, retry_failed=False):
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "done" or not retry_failed:
+                done.add(record["file"])
+    return done
+
+
+# Cut a torn last line (left by a crash mid-write) off the output, so the next record does not
+# get glued onto it; load_checkpoint already ignores the fragment, so that file is redone
+def repair_checkpoint(output):
+    if not os.path.exists(output):
+        return
+    with open(output, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            end = start
+        f.truncate(0)
+
+
+# Runs in an extraction worker process; the process pool already spreads files across CPUs,
+# so each file is read serially
+def _extract_file(path):
+    with open(path, "rb") as f:
+        extraction = pdf_extract.extract_pdf(f.read(), workers=1)
+    return extraction.sha256, extraction.text, extraction.page_count
+
+
+def _write_reports(analysis, path, root, reports_dir, formats):
+    base = os.path.join(reports_dir, os.path.splitext(os.path.relpath(path, root))[0])
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    for report_format in formats:
+        if report_format == "txt":
+            with open(base + ".txt", "w", encoding="utf8") as f:
+                f.write(json_to_text(analysis))
+        else:
+            data = REPORT_FORMATS[report_format][0](analysis)
+            # Older fpdf releases return the PDF as a latin-1 string
+            if isinstance(data, str):
+                data = data.encode("latin-1")
+            with open(f"{base}.{report_format}", "wb") as f:
+                f.write(data)
+
+
+class CorpusRun:
+    def __init__(self, root, output, workers=CORPUS_WORKERS, extract_workers=CORPUS_EXTRACT_WORKERS,
+                 reports_dir=None, formats=("txt",), retry_failed=False, limit=None, log=sys.stderr):
+        self.root = root
+        self.output = output
+        self.workers = workers
+        self.extract_workers = extract_workers
+        self.reports_dir = reports_dir
+        self.formats = formats
+        self.retry_failed = retry_failed
+        self.limit = limit
+        self.log = log
+        self.counts = {"done": 0, "failed": 0, "skipped": 0, "cached": 0, "pages": 0}
+        self._lock = threading.Lock()
+        self.progress_every = 0
+        self._start = None
+        self._out = None
+        self._extractor = None
+
+    # Analysis stage for one file whose extraction was submitted at start
+    def _analyze(self, path, start, extraction):
+        record = {"file": path, "status": "failed", "pages": 0}
+        try:
+            sha256, text, page_count = extraction.result()
+            record.update(sha256=sha256, pages=page_count)
+            # Files already run in parallel, so each one analyzes its chunks with a smaller pool
+            analysis, from_cache = document_analysis.analyze_pdf_cached(
+                sha256, text, max_workers=max(1, document_analysis.DOC_ANALYSIS_WORKERS // self.workers)
+            )
+            if self.reports_dir:
+                _write_reports(analysis, path, self.root, self.reports_dir, self.formats)
+            record.update(status="done", from_cache=from_cache, analysis=analysis.model_dump())
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = round(time.time() - start, 2)
+        self._record(record)
+
+    # One complete line per document, flushed at once: the output file is also the checkpoint
+    def _record(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._out.write(line)
+            self._out.flush()
+            self.counts[record["status"]] += 1
+            self.counts["pages"] += record["pages"]
+            self.counts["cached"] += bool(record.get("from_cache"))
+            if record["status"] == "failed":
+                print(f"failed: {record['file']}: {record['error']}", file=self.log)
+            processed = self.counts["done"] + self.counts["failed"]
+            if self.progress_every and processed % self.progress_every == 0:
+                self.report(time.time() - self._start)
+
+    def throughput(self, elapsed):
+        minutes = max(elapsed, 1e-9) / 60
+        processed = self.counts["done"] + self.counts["failed"]
+        return processed / minutes, self.counts["pages"] / minutes
+
+    def report(self, elapsed):
+        docs_per_min, pages_per_min = self.throughput(elapsed)
+        counts = self.counts
+        print(
+            f"{counts['done']} done ({counts['cached']} cached), {counts['failed']} failed, "
+            f"{counts['skipped']} skipped, {counts['pages']} pages in {elapsed:.1f}s: "
+            f"{docs_per_min:.1f} docs/min, {pages_per_min:.1f} pages/min",
+            file=self.log,
+        )
+
+    # Move finished extractions on to the analysis pool and forget finished analyses; with
+    # block=True, first wait until something in either stage completes
+    def _advance(self, pool, extracting, analyzing, block):
+        if block:
+            concurrent.futures.wait(set(extracting) | analyzing, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in [future for future in extracting if future.done()]:
+            path, start = extracting.pop(future)
+            analyzing.add(pool.submit(self._analyze, path, start, future))
+        analyzing.difference_update([future for future in analyzing if future.done()])
+
+    def run(self, progress_every=25):
+        repair_checkpoint(self.output)
+        finished = load_checkpoint(self.output, self.retry_failed)
+        os.makedirs(os.path.dirname(self.output) or ".", exist_ok=True)
+        self.progress_every = progress_every
+        self._start = time.time()
+        submitted = 0
+        self._extractor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.extract_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        with open(self.output, "a", encoding="utf8") as self._out, self._extractor, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # Files go straight to the extractor processes, so extraction runs extract_workers wide
+            # whatever the number of analysis workers; each extracted file then queues for analysis.
+            # A bounded number of files is in flight instead of the whole corpus.
+            extracting, analyzing = {}, set()
+            in_flight = self.extract_workers + 2 * self.workers
+            exclude = {os.path.realpath(self.reports_dir)} if self.reports_dir else ()
+            for path in iter_pdfs(self.root, exclude):
+                if path in finished:
+                    self.counts["skipped"] += 1
+                    continue
+                if self.limit is not None and submitted >= self.limit:
+                    break
+                self._advance(pool, extracting, analyzing, block=False)
+                while len(extracting) + len(analyzing) >= in_flight:
+                    self._advance(pool, extracting, analyzing, block=True)
+                extracting[self._extractor.submit(_extract_file, path)] = (path, time.time())
+                submitted += 1
+            while extracting or analyzing:
+                self._advance(pool, extracting, analyzing, block=True)
+        elapsed = time.time() - self._start
+        self.report(elapsed)
+        return self.counts, elapsed
+
+
+# Offline analysis of a directory of judgments:
+#   python analyze_corpus.py judgments/ -o results.jsonl --reports-dir reports/ --formats txt,pdf
+# Rerunning the same command after a crash resumes where it stopped.
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Analyze every PDF under a directory and write JSONL results")
+    parser.add_argument("root", help="directory searched recursively for .pdf files")
+    parser.add_argument("-o", "--output", default="corpus_results.jsonl",
+                        help="JSONL results, also used to resume (default: %(default)s)")
+    parser.add_argument("-w", "--workers", type=int, default=CORPUS_WORKERS,
+                        help="documents analyzed at once (default: %(default)s)")
+    parser.add_argument("--extract-workers", type=int, default=CORPUS_EXTRACT_WORKERS,
+                        help="processes extracting PDF text (default: %(default)s)")
+    parser.add_argument("--reports-dir", help="also write a report per document under this directory")
+    parser.add_argument("--formats", default="txt", help="report formats: txt, pdf, docx (default: %(default)s)")
+    parser.add_argument("--retry-failed", action="store_true", help="redo documents that failed in an earlier run")
+    parser.add_argument("--limit", type=int, help="stop after this many new documents")
+    parser.add_argument("--progress-every", type=int, default=25, help="print throughput every N documents")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = [f for f in formats if f != "txt" and f not in REPORT_FORMATS]
+    if unknown:
+        parser.error(f"unknown report format: {', '.join(unknown)}")
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+
+    run = CorpusRun(
+        args.root, args.output, workers=args.workers, extract_workers=args.extract_workers,
+        reports_dir=args.reports_dir, formats=formats, retry_failed=args.retry_failed, limit=args.limit,
+    )
+    counts, _ = run.run(progress_every=args.progress_every)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
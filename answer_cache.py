@@ -0,0 +1,146 @@
+import hashlib
+import json
+import threading
+import time
+import zlib
+import numpy as np
+from ikapi import normalize_query
+
+EMBEDDING_DIM = 4096
+
+
+# Local embedding: L2-normalised hashed bag of unigrams and bigrams over the normalised query.
+# Cheap, deterministic across processes, and good enough to catch rephrasings of the same question.
+def hashing_embedding(text, dim=EMBEDDING_DIM):
+    tokens = normalize_query(text).split()
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        vector[zlib.crc32(feature.encode("utf8")) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# Cache of serialized LLM answers keyed by everything that determines the response.
+# The optional semantic tier maps near-duplicate queries onto an already cached answer built
+# from the same prompt, model and retrieved context.
+class AnswerCache:
+    def __init__(self, store, vector_store=None, threshold=0.92, embed=hashing_embedding, reload_interval=300.0):
+        self.store = store
+        self.vector_store = vector_store
+        self.threshold = threshold
+        self.embed = embed
+        # Vectors written by other processes are picked up when the index is reloaded
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._keys = None
+        self._scopes = None
+        self._rows = None
+        self._matrix = None
+        self._loaded_at = 0.0
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(template, model_config, query, context):
+        payload = json.dumps([template, sorted(model_config.items()), query, context])
+        return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+    # Semantic matches are only looked for among answers to the same prompt, model and context,
+    # so a rephrased query never gets an answer built from different source documents
+    @staticmethod
+    def scope(template, model_config, context):
+        payload = json.dumps([template, sorted(model_config.items()), context])
+        return hashlib.sha256(payload.encode("utf8")).hexdigest()[:16]
+
+    def get(self, template, model_config, query, context):
+        value = self.store.get(self.key(template, model_config, query, context))
+        if value is not None:
+            self._count("exact_hits")
+            return value
+        if self.vector_store is not None:
+            stale = []
+            # Best match first; a match whose answer was evicted falls through to the next one
+            for match in self._nearest(self.scope(template, model_config, context), query):
+                value = self.store.get(match)
+                if value is not None:
+                    break
+                stale.append(match)
+            self._forget(stale)
+            if value is not None:
+                self._count("semantic_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, template, model_config, query, context, value):
+        key = self.key(template, model_config, query, context)
+        self.store.set(key, value)
+        if self.vector_store is not None:
+            scope = self.scope(template, model_config, context)
+            vector = self.embed(query).astype(np.float32)
+            self.vector_store.set(key, scope.encode("ascii") + vector.tobytes())
+            with self._lock:
+                if self._matrix is None:
+                    return
+                row = self._rows.get(key)
+                if row is not None:
+                    self._scopes[row] = scope
+                    self._matrix[row] = vector
+                else:
+                    self._rows[key] = len(self._keys)
+                    self._keys.append(key)
+                    self._scopes.append(scope)
+                    self._matrix = np.vstack([self._matrix, vector])
+
+    # Vectors are stored as <16-byte scope><float32 embedding> so the index can be rebuilt from disk
+    def _load(self):
+        keys, scopes, vectors = [], [], []
+        for key, blob in self.vector_store.items():
+            keys.append(key)
+            scopes.append(blob[:16].decode("ascii"))
+            vectors.append(np.frombuffer(blob[16:], dtype=np.float32))
+        self._keys, self._scopes = keys, scopes
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._matrix = np.vstack(vectors) if vectors else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self._loaded_at = time.monotonic()
+
+    # Keys in scope whose similarity reaches the threshold, most similar first
+    def _nearest(self, scope, query):
+        vector = self.embed(query)
+        with self._lock:
+            if self._matrix is None or time.monotonic() - self._loaded_at > self.reload_interval:
+                self._load()
+            if not self._keys:
+                return []
+            scores = self._matrix @ vector
+            in_scope = np.fromiter((s == scope for s in self._scopes), dtype=bool, count=len(self._scopes))
+            candidates = np.flatnonzero(in_scope & (scores >= self.threshold))
+            return [self._keys[row] for row in candidates[np.argsort(-scores[candidates], kind="stable")]]
+
+    # Drop index rows (and stored vectors) whose answers are gone from the store
+    def _forget(self, keys):
+        if not keys:
+            return
+        for key in keys:
+            self.vector_store.delete(key)
+        with self._lock:
+            rows = [self._rows[key] for key in keys if key in self._rows]
+            if not rows:
+                return
+            dropped = set(rows)
+            self._keys = [key for row, key in enumerate(self._keys) if row not in dropped]
+            self._scopes = [scope for row, scope in enumerate(self._scopes) if row not in dropped]
+            self._rows = {key: row for row, key in enumerate(self._keys)}
+            self._matrix = np.delete(self._matrix, rows, axis=0)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = sum(stats.values())
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        stats["store"] = self.store.stats()
+        return stats
@@ -0,0 +1,46 @@
+import streamlit as st
+import streamlit.components.v1 as components
+import auth_session
+
+# Browser half of a remembered sign-in: only an opaque session id lives in the cookie; the
+# tokens stay server side in auth_session's store
+SESSION_COOKIE = "kkp_session"
+
+
+def _set_cookie(value, max_age):
+    # Streamlit cannot set response cookies, so a zero-height component writes it on the page
+    components.html(
+        "<script>"
+        f"parent.document.cookie = '{SESSION_COOKIE}={value}; Max-Age={max_age}; Path=/; SameSite=Strict'"
+        " + (parent.location.protocol === 'https:' ? '; Secure' : '');"
+        "</script>",
+        height=0,
+    )
+
+
+# auth_session.keep_alive for pages: restores a remembered sign-in from the cookie after a reload
+# or in a new tab, and remembers a fresh password sign-in on the first page that renders it
+def keep_alive(state):
+    if not auth_session.keep_alive(state, session_id=st.context.cookies.get(SESSION_COOKIE)):
+        return False
+    session = state.get("auth_session")
+    if session is not None and session.session_id is None:
+        _set_cookie(auth_session.remember(state), int(auth_session.AUTH_SESSION_TTL))
+    return True
+
+
+# For pages that need a signed-in user: an expired, revoked or missing session is cleared and
+# the user is sent to the login page
+def require_login(state):
+    if keep_alive(state):
+        return True
+    for key in list(state.keys()):
+        del state[key]
+    st.switch_page("account.py")
+
+
+def sign_out(state):
+    auth_session.sign_out(state)
+    _set_cookie("", 0)
+    for key in list(state.keys()):
+        del state[key]
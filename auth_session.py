@@ -0,0 +1,367 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+import jwt
+import requests
+from cryptography import x509
+import firebase_auth
+from disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = os.getenv(
+    "FIREBASE_CERTS_URL",
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com",
+)
+FIREBASE_CREDENTIALS_FILE = "kanoon-ki-pehchaan-6ff0ed4a9c13.json"
+# ID tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+# Allowed clock difference with Google when checking exp/iat/auth_time
+TOKEN_LEEWAY = 60
+# Wait after a failed refresh before trying again; doubles on each failure up to the maximum
+TOKEN_REFRESH_BACKOFF = float(os.getenv("TOKEN_REFRESH_BACKOFF", "30"))
+TOKEN_REFRESH_MAX_BACKOFF = 240.0
+# How long a remembered sign-in can be restored after the last token refresh
+AUTH_SESSION_TTL = float(os.getenv("AUTH_SESSION_TTL", str(30 * 86400)))
+# Refresh failures that retrying cannot fix; the session then lasts until its ID token expires
+PERMANENT_REFRESH_ERRORS = frozenset({
+    "TOKEN_EXPIRED", "INVALID_REFRESH_TOKEN", "USER_DISABLED", "USER_NOT_FOUND",
+    "INVALID_GRANT_TYPE", "MISSING_REFRESH_TOKEN", "PROJECT_NUMBER_MISMATCH",
+})
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class AuthError(Exception):
+    pass
+
+
+def _project_id():
+    project_id = os.getenv("FIREBASE_PROJECT_ID")
+    if not project_id and os.path.exists(FIREBASE_CREDENTIALS_FILE):
+        with open(FIREBASE_CREDENTIALS_FILE, encoding="utf8") as f:
+            project_id = json.load(f).get("project_id")
+    return project_id
+
+
+# Google's token signing certificates, kept until the Cache-Control max-age of the response runs
+# out. Keys are re-fetched in the background shortly before they expire, so verification only
+# waits on the network for the very first fetch or when a token names a key not seen yet.
+class PublicKeyCache:
+    def __init__(self, url=GOOGLE_CERTS_URL, timeout=(3.05, 10), refresh_margin=300):
+        self.url = url
+        self.timeout = timeout
+        self.refresh_margin = refresh_margin
+        self.session = requests.Session()
+        self._keys = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._stats = {"fetches": 0, "background_fetches": 0, "failures": 0}
+
+    def _fetch(self):
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode("ascii")).public_key()
+            for kid, pem in response.json().items()
+        }
+        match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else 3600
+        age = response.headers.get("Age", "0")
+        max_age -= int(age) if age.isdigit() else 0
+        with self._lock:
+            self._keys = keys
+            self._expires_at = time.time() + max(max_age, 0)
+            self._last_fetch = time.time()
+            self._stats["fetches"] += 1
+
+    def _background_fetch(self):
+        try:
+            self._fetch()
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+            logger.warning(f"Refreshing Firebase signing keys failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    # Start a background fetch if the keys are missing or about to expire; never blocks
+    def warm_up(self):
+        with self._lock:
+            if self._refreshing or time.time() < self._expires_at - self.refresh_margin:
+                return
+            self._refreshing = True
+            self._stats["background_fetches"] += 1
+        threading.Thread(target=self._background_fetch, daemon=True).start()
+
+    def get(self, kid):
+        with self._lock:
+            key = self._keys.get(kid)
+            fresh = time.time() < self._expires_at
+            # A new kid means Google rotated keys; look it up at most once a minute
+            recently_fetched = time.time() - self._last_fetch < 60
+        if key is not None and fresh:
+            self.warm_up()
+            return key
+        if key is None and recently_fetched and fresh:
+            raise AuthError(f"unknown signing key {kid}")
+        try:
+            self._fetch()
+        except (requests.RequestException, ValueError) as e:
+            with self._lock:
+                self._stats["failures"] += 1
+            # An expired copy of a known key beats failing every check while Google is unreachable
+            if key is not None:
+                return key
+            raise AuthError(f"could not fetch signing keys: {e}") from e
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None:
+            raise AuthError(f"unknown signing key {kid}")
+        return key
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, keys=len(self._keys), expires_in=max(self._expires_at - time.time(), 0.0))
+
+
+_keys = PublicKeyCache()
+
+
+# Claims of a Firebase ID token, verified locally against the cached signing keys.
+# Tokens from the Auth emulator are unsigned, so only their claims are checked.
+def verify_id_token(token, project_id=None, keys=_keys):
+    project_id = project_id or _project_id()
+    if not project_id:
+        raise AuthError("FIREBASE_PROJECT_ID is not set")
+    try:
+        options = {"require": ["exp", "iat", "sub", "aud", "iss"]}
+        if firebase_auth.FIREBASE_AUTH_EMULATOR_HOST:
+            key, algorithms = None, None
+            # PyJWT skips every claim check along with the signature unless they are asked for
+            options.update(verify_signature=False, verify_exp=True, verify_iat=True, verify_aud=True, verify_iss=True)
+        else:
+            header = jwt.get_unverified_header(token)
+            if header.get("alg") != "RS256":
+                raise AuthError("ID token is not signed with RS256")
+            key, algorithms = keys.get(header.get("kid")), ["RS256"]
+        claims = jwt.decode(
+            token, key, algorithms=algorithms, audience=project_id,
+            issuer=f"https://securetoken.google.com/{project_id}", leeway=TOKEN_LEEWAY, options=options,
+        )
+    except jwt.PyJWTError as e:
+        raise AuthError(f"invalid ID token: {e}") from e
+    if not claims.get("sub"):
+        raise AuthError("ID token has no subject")
+    if claims.get("auth_time", 0) > time.time() + TOKEN_LEEWAY:
+        raise AuthError("ID token auth_time is in the future")
+    return claims
+
+
+_refresher = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="auth-refresh")
+
+
+# The tokens of one signed-in user, kept in Streamlit session state. The ID token is checked
+# locally; it is refreshed in the background once it is within TOKEN_REFRESH_MARGIN of expiry,
+# so page renders keep using the still-valid token instead of waiting on Firebase.
+class TokenSession:
+    def __init__(self, id_token, refresh_token, claims):
+        self.id_token = id_token
+        self.refresh_token = refresh_token
+        self.claims = claims
+        self.error = None
+        self._future = None
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+        self._backoff = TOKEN_REFRESH_BACKOFF
+        self._gave_up = False
+        # Set once the session is remembered (see remember()); profile holds username and email
+        self.session_id = None
+        self.profile = {}
+
+    # From a signInWithPassword response (returnSecureToken=True)
+    @classmethod
+    def from_sign_in(cls, data):
+        return cls(data["idToken"], data["refreshToken"], verify_id_token(data["idToken"]))
+
+    @property
+    def expires_at(self):
+        return self.claims["exp"]
+
+    @property
+    def uid(self):
+        return self.claims["sub"]
+
+    def _refresh(self, api_key):
+        status, data = firebase_auth.get_client(api_key).refresh(self.refresh_token)
+        if status != 200:
+            raise AuthError(data.get("error", {}).get("message", f"token refresh failed with HTTP {status}"))
+        claims = verify_id_token(data["id_token"])
+        if claims["sub"] != self.uid:
+            raise AuthError("refreshed token belongs to another user")
+        return data["id_token"], data.get("refresh_token", self.refresh_token), claims
+
+    def _collect(self):
+        future = self._future
+        if future is None or not future.done():
+            return
+        self._future = None
+        try:
+            self.id_token, self.refresh_token, self.claims = future.result()
+            self.error = None
+            self._retry_at, self._backoff = 0.0, TOKEN_REFRESH_BACKOFF
+            self.persist()
+        except Exception as e:
+            self.error = str(e)
+            # Firebase messages start with the error code, e.g. "TOKEN_EXPIRED" or "USER_DISABLED : ..."
+            if self.error.split(" ", 1)[0] in PERMANENT_REFRESH_ERRORS:
+                self._gave_up = True
+                logger.warning(f"Token refresh rejected for {self.uid}, not retrying: {e}")
+            else:
+                self._retry_at = time.time() + self._backoff
+                self._backoff = min(self._backoff * 2, TOKEN_REFRESH_MAX_BACKOFF)
+                logger.warning(f"Token refresh failed for {self.uid}: {e}")
+
+    # Save the current tokens for restore(); a no-op for sessions that were not remembered
+    def persist(self):
+        if self.session_id is None:
+            return
+        record = {"uid": self.uid, "id_token": self.id_token, "refresh_token": self.refresh_token, **self.profile}
+        _session_store().set(_store_key(self.session_id), json.dumps(record))
+
+    # Called on every page render. Returns False once the session cannot be kept alive
+    # (token expired and the refresh failed or was rejected).
+    def ensure_fresh(self, api_key, wait=5.0):
+        with self._lock:
+            self._collect()
+            now = time.time()
+            # After a failure, wait out the backoff instead of retrying on every render; an
+            # expired token still gets one attempt, since the session ends without it
+            due = now >= self._retry_at or now >= self.expires_at
+            if now >= self.expires_at - TOKEN_REFRESH_MARGIN and self._future is None and due and not self._gave_up:
+                self._future = _refresher.submit(self._refresh, api_key)
+            future = self._future
+        if now < self.expires_at:
+            return True
+        # Only reached when no page was rendered for the whole lifetime of a token
+        if future is not None:
+            concurrent.futures.wait([future], timeout=wait)
+        with self._lock:
+            self._collect()
+            return time.time() < self.expires_at
+
+
+_sessions = None
+_sessions_lock = threading.Lock()
+
+
+# Remembered sign-ins, keyed by a hash of the opaque session id the browser keeps in a cookie,
+# so a reload or a new tab resumes the session without another password sign-in
+def _session_store():
+    global _sessions
+    with _sessions_lock:
+        if _sessions is None:
+            _sessions = DiskCache("auth_sessions", max_bytes=16 * 1024 * 1024, ttl=AUTH_SESSION_TTL)
+        return _sessions
+
+
+def _store_key(session_id):
+    return hashlib.sha256(session_id.encode("utf8")).hexdigest()
+
+
+# Remember the signed-in session in state; returns the new session id for the browser to keep
+def remember(state):
+    session = state.get("auth_session")
+    if session is None:
+        return None
+    session.session_id = secrets.token_urlsafe(32)
+    session.profile = {"username": state.get("username"), "email": state.get("useremail")}
+    session.persist()
+    return session.session_id
+
+
+# Resume a remembered session into state. A still-valid ID token is verified locally; an expired
+# one costs a single token refresh. Returns False when there is nothing (left) to resume.
+def restore(state, session_id, api_key):
+    raw = _session_store().get(_store_key(session_id))
+    if raw is None:
+        return False
+    record = json.loads(raw)
+    try:
+        try:
+            session = TokenSession(record["id_token"], record["refresh_token"], verify_id_token(record["id_token"]))
+        except AuthError:
+            session = TokenSession(None, record["refresh_token"], {"sub": record["uid"], "exp": 0})
+            session.id_token, session.refresh_token, session.claims = session._refresh(api_key)
+    except AuthError as e:
+        logger.info(f"Could not restore session for {record['uid']}: {e}")
+        if str(e).split(" ", 1)[0] in PERMANENT_REFRESH_ERRORS:
+            forget(session_id)
+        return False
+    except (requests.RequestException, KeyError) as e:
+        logger.warning(f"Could not restore session for {record.get('uid')}: {e}")
+        return False
+    session.session_id = session_id
+    session.profile = {"username": record.get("username"), "email": record.get("email")}
+    session.persist()
+    state.auth_session = session
+    state.username = record.get("username")
+    state.useremail = record.get("email")
+    state.authenticated = True
+    return True
+
+
+def forget(session_id):
+    _session_store().delete(_store_key(session_id))
+
+
+# Record a successful password sign-in in session state. Falls back to the plain flags when
+# the token cannot be verified (e.g. no project id configured).
+def start(state, data):
+    try:
+        state.auth_session = TokenSession.from_sign_in(data)
+    except (AuthError, KeyError) as e:
+        logger.warning(f"Keeping session without tokens: {e}")
+        state.auth_session = None
+
+
+# Keep the session's tokens fresh; signs the session out when they cannot be renewed.
+# With session_id (from the browser), a session missing from state is restored first.
+def keep_alive(state, api_key=None, session_id=None):
+    _keys.warm_up()
+    api_key = api_key or os.getenv("FIREBASE_API_KEY")
+    session = state.get("auth_session")
+    if session is None:
+        if session_id and not state.get("authenticated") and restore(state, session_id, api_key):
+            return True
+        return state.get("authenticated", False)
+    if session.ensure_fresh(api_key):
+        return True
+    logger.info(f"Session expired for {session.uid}: {session.error}")
+    if session.session_id is not None:
+        forget(session.session_id)
+    state.auth_session = None
+    state.authenticated = False
+    return False
+
+
+# Explicit logout: the remembered session can no longer be restored
+def sign_out(state):
+    session = state.get("auth_session")
+    if session is not None and session.session_id is not None:
+        forget(session.session_id)
+    state.auth_session = None
+    state.authenticated = False
+
+
+def stats():
+    return {"keys": _keys.stats()}
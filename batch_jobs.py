@@ -0,0 +1,115 @@
+import concurrent.futures
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Optional
+import document_analysis
+import pdf_extract
+from reports import json_to_text
+from schemas import DocumentAnalysis
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+QUEUED, EXTRACTING, ANALYZING, DONE, FAILED = "queued", "extracting", "analyzing", "done", "failed"
+
+
+@dataclass
+class BatchJob:
+    name: str
+    data: bytes
+    status: str = QUEUED
+    pages: int = 0
+    chunks_done: int = 0
+    chunks_total: int = 0
+    analysis: Optional[DocumentAnalysis] = None
+    from_cache: bool = False
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def progress(self):
+        if self.status in (DONE, FAILED):
+            return 1.0
+        if self.status == ANALYZING and self.chunks_total:
+            return 0.1 + 0.9 * self.chunks_done / self.chunks_total
+        return 0.05 if self.status == EXTRACTING else 0.0
+
+
+# Runs extract -> analyze for a list of files on a bounded thread pool. Job objects are updated
+# in place by the workers, so a UI can poll them while the batch runs.
+class BatchRunner:
+    def __init__(self, files, workers=BATCH_WORKERS):
+        self.jobs = [BatchJob(name=name, data=data) for name, data in files]
+        self.workers = workers
+        self.started = time.time()
+        self.finished = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        self._futures = [self._executor.submit(self._run, job) for job in self.jobs]
+        self._executor.shutdown(wait=False)
+        threading.Thread(target=self._wait, daemon=True).start()
+
+    def _run(self, job):
+        start = time.time()
+        try:
+            job.status = EXTRACTING
+            extraction = pdf_extract.extract_pdf(job.data)
+            job.pages = extraction.page_count
+            job.status = ANALYZING
+
+            def on_progress(done, total):
+                job.chunks_done, job.chunks_total = done, total
+
+            # Files already run in parallel, so each one analyzes its chunks with a smaller pool
+            job.analysis, job.from_cache = document_analysis.analyze_pdf_cached(
+                extraction.sha256, extraction.text, on_progress=on_progress,
+                max_workers=max(1, document_analysis.DOC_ANALYSIS_WORKERS // self.workers),
+            )
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.seconds = time.time() - start
+            job.data = b""
+
+    def _wait(self):
+        concurrent.futures.wait(self._futures)
+        self.finished = time.time()
+
+    def done(self):
+        return self.finished is not None
+
+    def counts(self):
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def progress(self):
+        return sum(job.progress for job in self.jobs) / len(self.jobs) if self.jobs else 1.0
+
+
+# ZIP with one text report per analyzed file plus results.jsonl covering every file
+def build_archive(jobs):
+    buffer = io.BytesIO()
+    lines = []
+    used = set()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i, job in enumerate(jobs, start=1):
+            record = {"file": job.name, "status": job.status, "pages": job.pages, "seconds": round(job.seconds, 2)}
+            if job.analysis is not None:
+                record["analysis"] = job.analysis.model_dump()
+                report_name = f"{os.path.splitext(job.name)[0]}.txt"
+                if report_name in used:
+                    report_name = f"{i:03d}_{report_name}"
+                used.add(report_name)
+                archive.writestr(report_name, json_to_text(job.analysis))
+            if job.error:
+                record["error"] = job.error
+            lines.append(json.dumps(record, ensure_ascii=False))
+        archive.writestr("results.jsonl", "\n".join(lines) + "\n")
+    return buffer.getvalue()
@@ -0,0 +1,71 @@
+# Accuracy and throughput of the legal-query classifier against the previous substring matcher.
+#
+#   python benchmarks/classifier_benchmark.py [--repeat 2000]
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from query_classifier import is_indian_law_related, classify_batch
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "legal_queries.jsonl")
+
+
+# Previous implementation from pages/home.py, kept for comparison
+def legacy_is_indian_law_related(query):
+    if not query or not isinstance(query, str):
+        return False
+    query = query.lower()
+    indian_legal_keywords = ["indian", "india", "ipc", "crpc", "constitution", "section", "act", "law", "case", "statute", "article", "court"]
+    for keyword in indian_legal_keywords:
+        if keyword in query:
+            return True
+    patterns = [r"section \d+", r"article \d+", r"ipc \d+"]
+    for pattern in patterns:
+        if re.search(pattern, query, re.IGNORECASE):
+            return True
+    return False
+
+
+def load_samples(path=DATA_PATH):
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def accuracy(classify, samples):
+    wrong = [s for s in samples if classify(s["query"]) != s["legal"]]
+    return 1 - len(wrong) / len(samples), wrong
+
+
+def throughput(classify_all, queries, repeat):
+    batch = queries * repeat
+    start = time.perf_counter()
+    classify_all(batch)
+    elapsed = time.perf_counter() - start
+    return len(batch) / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000, help="times the sample set is replayed for timing")
+    args = parser.parse_args()
+
+    samples = load_samples()
+    queries = [s["query"] for s in samples]
+    for name, classify, classify_all in [
+        ("legacy", legacy_is_indian_law_related, lambda qs: [legacy_is_indian_law_related(q) for q in qs]),
+        ("compiled", is_indian_law_related, classify_batch),
+    ]:
+        acc, wrong = accuracy(classify, samples)
+        rate, elapsed = throughput(classify_all, queries, args.repeat)
+        print(f"{name:>9}: accuracy {acc:.1%} ({len(samples) - len(wrong)}/{len(samples)}), "
+              f"{rate:,.0f} queries/s ({elapsed * 1000:.0f} ms for {len(queries) * args.repeat:,})")
+        for s in wrong:
+            print(f"           misclassified: {s['query']!r} (expected {'legal' if s['legal'] else 'not legal'})")
+
+
+if __name__ == "__main__":
+    main()
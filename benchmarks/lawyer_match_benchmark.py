@@ -0,0 +1,88 @@
+# Build time, query latency and update cost of the lawyer matching index on synthetic profiles.
+#
+#   python benchmarks/lawyer_match_benchmark.py [--lawyers 50000] [--queries 200]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lawyer_match import LawyerIndex
+
+PRACTICE_AREAS = [
+    "criminal law bail trials under ipc and crpc",
+    "family law divorce child custody and maintenance",
+    "property disputes, landlord and tenant eviction suits and land acquisition",
+    "corporate law company matters and insolvency under ibc",
+    "consumer protection and deficiency of service claims",
+    "labour law and industrial disputes",
+    "direct and indirect tax appeals including gst",
+    "cyber crime and offences under the it act",
+    "constitutional law and writ petitions before the high court",
+    "motor accident claims tribunal matters",
+]
+COLLEGES = ["NLSIU Bangalore", "NALSAR Hyderabad", "Faculty of Law, Delhi University", "ILS Law College Pune",
+            "Government Law College Mumbai"]
+CASES = [
+    "My landlord is refusing to return the security deposit and wants to evict me",
+    "I was arrested under section 498A and need anticipatory bail",
+    "Company has not paid my salary for six months and terminated me",
+    "Online fraud took money from my bank account through a phishing link",
+    "Seeking divorce by mutual consent and custody of our daughter",
+]
+
+
+def synthetic_profiles(n, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "name": f"lawyer{i:06d}",
+            "degree": rng.choice(["LLB", "LLM", "BA LLB (Hons)"]),
+            "college": rng.choice(COLLEGES),
+            "myQualifications": f"{rng.randint(1, 35)} years of practice in " + "; ".join(rng.sample(PRACTICE_AREAS, 2)),
+            "social_media": "",
+        }
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lawyer matching index")
+    parser.add_argument("--lawyers", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = LawyerIndex.from_profiles(synthetic_profiles(args.lawyers))
+    print(f"build: {len(index):,} profiles in {time.perf_counter() - start:.2f}s")
+
+    latencies = []
+    for i in range(args.queries):
+        start = time.perf_counter()
+        index.top(CASES[i % len(CASES)], k=args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"query: p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms (top {args.k})")
+
+    rng = random.Random(1)
+    latencies = []
+    for i in range(args.queries):
+        profile = next(synthetic_profiles(1, seed=i))
+        profile["name"] = f"lawyer{rng.randrange(args.lawyers):06d}"
+        start = time.perf_counter()
+        index.upsert(profile)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"update: p50 {percentile(latencies, 50):.3f} ms, p99 {percentile(latencies, 99):.3f} ms per profile")
+
+    for case in CASES[:2]:
+        print(f"\n{case}")
+        for score, name in index.top(case, k=3):
+            print(f"  {score:6.2f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
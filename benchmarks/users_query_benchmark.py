@@ -0,0 +1,160 @@
+# Latency of the users-table queries issued by the lawyer pages, before and after the key and
+# index migrations. Seeds synthetic lawyers into a scratch database on a local MySQL server
+# (connection settings from DB_HOST/DB_USER/DB_PASSWORD); the scratch database is recreated.
+#
+#   python benchmarks/users_query_benchmark.py [--lawyers 100000] [--repeat 200] [--database lawyers_bench]
+#
+# Each run also records the query plans MySQL chose before and after (EXPLAIN access type and
+# key), and appends the whole report to benchmarks/results/users_query_benchmark.md unless
+# --no-record is given, so the index choice stays backed by measured runs.
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mysql.connector
+import db
+import migrate
+from lawyers import DIRECTORY_COLUMNS, LAWYER_PAGE_SIZE
+from lawyer_match import MATCH_FIELDS
+
+COLUMNS = ", ".join(DIRECTORY_COLUMNS)
+AREAS = ["criminal", "family", "property", "corporate", "consumer", "labour", "tax", "cyber", "constitutional", "motor accident"]
+
+
+def seed(conn, n, batch=5000):
+    rng = random.Random(0)
+    cursor = conn.cursor()
+    rows = []
+    for i in range(n):
+        rows.append((
+            f"lawyer{i:07d}", rng.choice(["LLB", "LLM", "BA LLB"]), f"College {rng.randrange(200)}",
+            f"{rng.randint(1, 35)} years in {rng.choice(AREAS)} and {rng.choice(AREAS)} law",
+            f"9{rng.randrange(10 ** 9):09d}", "", f"images/thumbs/{rng.getrandbits(128):032x}_600.webp",
+        ))
+        if len(rows) == batch or i == n - 1:
+            cursor.executemany(f"INSERT INTO users ({COLUMNS}) VALUES ({', '.join(['%s'] * len(DIRECTORY_COLUMNS))})", rows)
+            conn.commit()
+            rows = []
+    cursor.close()
+
+
+# (label, page, statement builder, repeat divisor); builders return (sql, params) for a random lawyer
+def workload(n):
+    def name(rng):
+        return f"lawyer{rng.randrange(n):07d}"
+
+    return [
+        ("profile by name", "lawyer.py, editlawyer.py",
+         lambda rng: (f"SELECT {COLUMNS} FROM users WHERE name = %s", (name(rng),)), 1),
+        ("update profile", "editlawyer.py",
+         lambda rng: ("UPDATE users SET degree = %s WHERE name = %s", (rng.choice(["LLB", "LLM"]), name(rng))), 1),
+        ("directory first page", "user_lawers_connect.py",
+         lambda rng: (f"SELECT {COLUMNS} FROM users ORDER BY name LIMIT %s", (LAWYER_PAGE_SIZE + 1,)), 1),
+        ("directory keyset page", "user_lawers_connect.py",
+         lambda rng: (f"SELECT {COLUMNS} FROM users WHERE name > %s ORDER BY name LIMIT %s",
+                      (name(rng), LAWYER_PAGE_SIZE + 1)), 1),
+        ("matched profiles (IN)", "user_lawers_connect.py",
+         lambda rng: (f"SELECT {COLUMNS} FROM users WHERE name IN ({', '.join(['%s'] * LAWYER_PAGE_SIZE)})",
+                      tuple(name(rng) for _ in range(LAWYER_PAGE_SIZE))), 1),
+        ("match index load", "user_lawers_connect.py",
+         lambda rng: (f"SELECT name, {', '.join(MATCH_FIELDS)} FROM users", ()), 40),
+    ]
+
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "users_query_benchmark.md")
+
+
+# {label: "type/key"} from EXPLAIN for one instance of every workload query
+def plans(conn, n):
+    rng = random.Random(2)
+    cursor = conn.cursor(dictionary=True)
+    result = {}
+    for label, _, build, _ in workload(n):
+        sql, params = build(rng)
+        cursor.execute(f"EXPLAIN {sql}", params)
+        rows = cursor.fetchall()
+        result[label] = ", ".join(f"{row['type']}/{row['key'] or '-'}" for row in rows)
+    cursor.close()
+    return result
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def measure(conn, n, repeat):
+    rng = random.Random(1)
+    results = {}
+    cursor = conn.cursor()
+    for label, _, build, divisor in workload(n):
+        latencies = []
+        for _ in range(max(3, repeat // divisor)):
+            sql, params = build(rng)
+            start = time.perf_counter()
+            cursor.execute(sql, params)
+            if cursor.with_rows:
+                cursor.fetchall()
+            else:
+                conn.commit()
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[label] = (percentile(latencies, 50), percentile(latencies, 99))
+    cursor.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark users-table queries before and after the migrations")
+    parser.add_argument("--lawyers", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--database", default="lawyers_bench", help="scratch database, dropped and recreated")
+    parser.add_argument("--no-record", dest="record", action="store_false",
+                        help=f"do not append the report to {os.path.relpath(RESULTS_PATH)}")
+    args = parser.parse_args()
+    if args.database == db.DB_CONFIG["database"]:
+        parser.error("refusing to benchmark in the application database")
+
+    config = {key: value for key, value in db.DB_CONFIG.items() if key != "database"}
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+    cursor.execute(f"CREATE DATABASE `{args.database}`")
+    cursor.execute(f"USE `{args.database}`")
+    cursor.close()
+
+    migrate.migrate(conn, target=1, log=lambda message: None)
+    start = time.perf_counter()
+    seed(conn, args.lawyers)
+    lines = [f"seeded {args.lawyers:,} lawyers in {time.perf_counter() - start:.1f}s"]
+    before, plans_before = measure(conn, args.lawyers, args.repeat), plans(conn, args.lawyers)
+    start = time.perf_counter()
+    migrate.migrate(conn, log=lambda message: None)
+    lines.append(f"migrations applied in {time.perf_counter() - start:.1f}s")
+    after, plans_after = measure(conn, args.lawyers, args.repeat), plans(conn, args.lawyers)
+    server = conn.get_server_info()
+    conn.close()
+
+    lines += ["", f"{'query':24} {'page':26} {'before p50/p99 ms':>20} {'after p50/p99 ms':>20}"]
+    for label, page, _, _ in workload(args.lawyers):
+        lines.append(f"{label:24} {page:26} {before[label][0]:9.2f} /{before[label][1]:8.2f} "
+                     f"{after[label][0]:9.2f} /{after[label][1]:8.2f}")
+    lines += ["", f"{'query':24} {'plan before (type/key)':28} plan after (type/key)"]
+    for label, _, _, _ in workload(args.lawyers):
+        lines.append(f"{label:24} {plans_before[label]:28} {plans_after[label]}")
+    report = "\n".join(lines)
+    print(report)
+
+    if args.record:
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        with open(RESULTS_PATH, "a", encoding="utf8") as f:
+            f.write(f"\n## {datetime.date.today()}: MySQL {server}, {args.lawyers:,} lawyers, "
+                    f"--repeat {args.repeat}\n\n```\n{report}\n```\n")
+        print(f"\nrecorded in {os.path.relpath(RESULTS_PATH)}")
+
+
+if __name__ == "__main__":
+    main()
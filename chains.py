@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+from schemas import LegalAnalysis, DocumentAnalysis
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+LEGAL_MODEL = {"model": "gemini-1.5-pro", "temperature": 0.2, "max_output_tokens": 4096}
+DOCUMENT_MODEL = {"model": "gemini-1.5-pro"}
+
+LEGAL_PROMPT_TEMPLATE = """
+    You are Kanoon ki Pehchaan, an AI legal expert specializing in Indian law.
+    
+    USER QUERY: {query}
+    
+    INDIAN KANOON DATA:
+    {kanoon_data}
+    
+    Your task is to analyze this query and the provided legal references from Indian Kanoon.
+    Provide a comprehensive legal analysis following the structured format below.
+    
+    {format_instructions}
+    
+    Make sure to properly cite any legal references and maintain a professional legal tone.
+    Include only factual information supported by the provided Indian Kanoon data or well-established legal principles.
+    """
+
+DOCUMENT_PROMPT_TEMPLATE = """
+Analyze the following text and extract key points and a summary.
+{format_instructions}
+Text: {text}
+"""
+
+DOCUMENT_REDUCE_PROMPT_TEMPLATE = """
+The following are analyses of consecutive sections of one long document.
+Combine them into a single analysis of the whole document: write one summary covering the
+entire document and list its most important key points, removing duplicates.
+{format_instructions}
+Section analyses:
+{text}
+"""
+
+_lock = threading.Lock()
+_models = {}
+_chains = {}
+_metrics = {}
+_warm_thread = None
+
+
+def _record(name, seconds):
+    _metrics[name] = {"build_seconds": seconds, "built_at": time.time(), "uses": 0}
+    logger.info(f"Built {name} in {seconds * 1000:.1f} ms")
+
+
+# One chat model per distinct configuration, shared by every chain that uses it
+def get_model(**config):
+    key = tuple(sorted(config.items()))
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                if os.getenv("GOOGLE_API_KEY"):
+                    config = dict(config, google_api_key=os.getenv("GOOGLE_API_KEY"))
+                model = ChatGoogleGenerativeAI(**config)
+                _models[key] = model
+                _record(f"model:{config.get('model')}:{config.get('temperature', 'default')}", time.perf_counter() - start)
+    return model
+
+
+def _legal_prompt():
+    parser = PydanticOutputParser(pydantic_object=LegalAnalysis)
+    prompt = ChatPromptTemplate.from_template(LEGAL_PROMPT_TEMPLATE).partial(
+        format_instructions=parser.get_format_instructions()
+    )
+    return prompt, parser
+
+
+def _build_legal_analysis():
+    prompt, parser = _legal_prompt()
+    return prompt | get_model(**LEGAL_MODEL) | parser
+
+
+# Streaming variant stops at the model; the caller parses the JSON incrementally
+def _build_legal_analysis_stream():
+    prompt, _ = _legal_prompt()
+    return prompt | get_model(**LEGAL_MODEL)
+
+
+def _build_document_analysis():
+    parser = PydanticOutputParser(pydantic_object=DocumentAnalysis)
+    prompt = PromptTemplate(
+        template=DOCUMENT_PROMPT_TEMPLATE,
+        input_variables=["text"],
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+    return prompt | get_model(**DOCUMENT_MODEL) | parser
+
+
+# Merges per-chunk analyses of a long document into one
+def _build_document_reduce():
+    parser = PydanticOutputParser(pydantic_object=DocumentAnalysis)
+    prompt = PromptTemplate(
+        template=DOCUMENT_REDUCE_PROMPT_TEMPLATE,
+        input_variables=["text"],
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+    return prompt | get_model(**DOCUMENT_MODEL) | parser
+
+
+BUILDERS = {
+    "legal_analysis": _build_legal_analysis,
+    "legal_analysis_stream": _build_legal_analysis_stream,
+    "document_analysis": _build_document_analysis,
+    "document_reduce": _build_document_reduce,
+}
+
+
+# Return the named chain, building it on first use; later calls from any session reuse it.
+# Two threads racing on a cold name may both build, but only the first result is kept.
+def get_chain(name):
+    chain = _chains.get(name)
+    if chain is None:
+        start = time.perf_counter()
+        built = BUILDERS[name]()
+        with _lock:
+            if name not in _chains:
+                _chains[name] = built
+                _record(name, time.perf_counter() - start)
+            chain = _chains[name]
+    with _lock:
+        _metrics[name]["uses"] += 1
+    return chain
+
+
+# Build every registered chain on a background thread, once per process
+def warm_up(names=None):
+    global _warm_thread
+    with _lock:
+        if _warm_thread is not None:
+            return _warm_thread
+        _warm_thread = threading.Thread(target=_warm, args=(names or list(BUILDERS),), name="chain-warmup", daemon=True)
+    _warm_thread.start()
+    return _warm_thread
+
+
+def _warm(names):
+    for name in names:
+        try:
+            get_chain(name)
+        except Exception as e:
+            logger.error(f"Failed to warm {name}: {e}")
+
+
+def build_metrics():
+    with _lock:
+        return {name: dict(values) for name, values in _metrics.items()}
@@ -0,0 +1,96 @@
+import math
+import re
+
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+_SHINGLE_WORDS = re.compile(r"\w+")
+
+
+# Local token estimate close to Gemini's SentencePiece counts for English legal text:
+# every punctuation mark is a token and words cost roughly one token per four characters.
+def estimate_tokens(text):
+    return sum(math.ceil(len(piece) / 4) for piece in _WORD_PIECES.findall(text))
+
+
+def _shingles(text, size=5):
+    words = _SHINGLE_WORDS.findall(text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+# True when most of a passage's 5-word shingles already appear in a chosen passage
+def _overlaps(shingles, chosen, threshold=0.5):
+    for other in chosen:
+        if shingles and len(shingles & other) / len(shingles) >= threshold:
+            return True
+    return False
+
+
+def _document_header(i, doc):
+    return (
+        f"DOCUMENT {i + 1}:\n"
+        f"Title: {doc.get('title', 'No title')}\n"
+        f"Source: {doc.get('docsource', 'Unknown')}\n"
+        f"Date: {doc.get('docdate', 'Unknown')}\n"
+        f"Link: https://api.indiankanoon.org/doc/{doc.get('tid', '')}/\n"
+    )
+
+
+# Build the Kanoon section of the prompt within token_budget.
+# Document headers always go in; passages are then admitted in order of BM25 relevance across
+# all documents (each document's best passage first), skipping near-duplicates, until the budget
+# is spent. index_for(doc) returns the PassageIndex for a document with content.
+# Returns the formatted text and a stats dict including the estimated tokens sent.
+def pack_kanoon_context(query, kanoon_data, index_for, token_budget=2000, max_documents=3, passages_per_document=8):
+    stats = {"budget": token_budget, "tokens": 0, "documents": [], "duplicates_dropped": 0, "passages": 0}
+    if not kanoon_data or kanoon_data.get("found", 0) <= 0:
+        text = "No data found from Indian Kanoon."
+        stats["tokens"] = estimate_tokens(text)
+        return text, stats
+
+    docs = kanoon_data.get("docs", [])[:max_documents]
+    preamble = f"Found {kanoon_data.get('found', 0)} results. Here are the top matches:\n\n"
+    headers = [_document_header(i, doc) for i, doc in enumerate(docs)]
+    used = estimate_tokens(preamble) + sum(estimate_tokens(header) for header in headers)
+
+    firsts, rest = [], []
+    for d, doc in enumerate(docs):
+        if not doc.get("content") or not doc.get("tid"):
+            continue
+        index = index_for(doc)
+        ranked = [(score, i) for score, i in index.top(query, k=passages_per_document) if score > 0]
+        if not ranked:
+            # Nothing matched the query; fall back to the opening passage
+            ranked = [(0.0, 0)] if index.passages else []
+        for rank, (score, i) in enumerate(ranked):
+            (firsts if rank == 0 else rest).append((score, d, i, index.passages[i]))
+    candidates = sorted(firsts, key=lambda c: -c[0]) + sorted(rest, key=lambda c: -c[0])
+
+    selected = {d: [] for d in range(len(docs))}
+    chosen_shingles = []
+    for score, d, i, passage in candidates:
+        shingles = _shingles(passage)
+        if _overlaps(shingles, chosen_shingles):
+            stats["duplicates_dropped"] += 1
+            continue
+        cost = estimate_tokens(passage) + 2
+        if used + cost > token_budget:
+            continue
+        selected[d].append((i, passage))
+        chosen_shingles.append(shingles)
+        used += cost
+
+    parts = [preamble]
+    for d, doc in enumerate(docs):
+        parts.append(headers[d])
+        excerpts = [passage for _, passage in sorted(selected[d])]
+        if excerpts:
+            parts.append("Excerpt: " + "\n...\n".join(excerpts) + "\n")
+        parts.append("\n")
+        stats["documents"].append({
+            "tid": doc.get("tid"),
+            "passages": len(excerpts),
+            "tokens": sum(estimate_tokens(passage) for passage in excerpts),
+        })
+        stats["passages"] += len(excerpts)
+    text = "".join(parts)
+    stats["tokens"] = estimate_tokens(text)
+    return text, stats
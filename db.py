@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import mysql.connector
+from mysql.connector import pooling
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "lawyers"),
+    "connection_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+}
+# Per-query socket timeouts need mysql-connector 9+, so they are only passed when configured
+if os.getenv("DB_READ_TIMEOUT"):
+    DB_CONFIG["read_timeout"] = int(os.getenv("DB_READ_TIMEOUT"))
+    DB_CONFIG["write_timeout"] = int(os.getenv("DB_WRITE_TIMEOUT", os.getenv("DB_READ_TIMEOUT")))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+# Seconds a caller waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+
+class PoolTimeout(mysql.connector.Error):
+    pass
+
+
+# Process-wide pool shared by every page. mysql.connector's pool pings each connection as it is
+# handed out and reconnects dead ones, but fails at once when it is exhausted, so callers queue
+# on a semaphore with a timeout instead; that is also where the wait time and utilization
+# metrics come from.
+class ConnectionPool:
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, **config):
+        self.size = size
+        self.timeout = timeout
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name="kanoon", pool_size=size, pool_reset_session=True, **config
+        )
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0, "timeouts": 0,
+            "wait_seconds": 0.0, "max_wait_seconds": 0.0, "in_use": 0, "peak_in_use": 0,
+        }
+
+    def _checkout(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(msg=f"no database connection free after {self.timeout:g}s")
+        waited = time.perf_counter() - start
+        try:
+            conn = self._pool.get_connection()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            stats = self._stats
+            stats["checkouts"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            stats["in_use"] += 1
+            stats["peak_in_use"] = max(stats["peak_in_use"], stats["in_use"])
+        return conn
+
+    def _release(self, conn):
+        with self._lock:
+            self._stats["in_use"] -= 1
+        try:
+            conn.close()  # returns a pooled connection to the pool
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(
+            size=self.size,
+            utilization=stats["in_use"] / self.size,
+            peak_utilization=stats["peak_in_use"] / self.size,
+            avg_wait_seconds=stats["wait_seconds"] / stats["checkouts"] if stats["checkouts"] else 0.0,
+        )
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(**DB_CONFIG)
+        return _pool
+
+
+@contextmanager
+def connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+
+# Cursor on a pooled connection; with commit=True the work is committed on success and
+# rolled back on error
+@contextmanager
+def cursor(dictionary=False, commit=False):
+    with connection() as conn:
+        cur = conn.cursor(dictionary=dictionary)
+        try:
+            yield cur
+            if commit:
+                conn.commit()
+        except Exception:
+            if commit:
+                conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def fetch_all(query, params=(), dictionary=True):
+    with cursor(dictionary=dictionary) as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+def fetch_one(query, params=(), dictionary=True):
+    with cursor(dictionary=dictionary) as cur:
+        cur.execute(query, params)
+        row = cur.fetchone()
+        cur.fetchall()  # drain the rest so the connection goes back clean
+        return row
+
+
+# Run one INSERT/UPDATE/DELETE and commit; returns the affected row count
+def execute(query, params=()):
+    with cursor(commit=True) as cur:
+        cur.execute(query, params)
+        return cur.rowcount
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+# Round trip through the pool, e.g. for a readiness probe: (ok, seconds, error message)
+def health_check():
+    start = time.perf_counter()
+    try:
+        fetch_one("SELECT 1", dictionary=False)
+        return True, time.perf_counter() - start, None
+    except mysql.connector.Error as err:
+        return False, time.perf_counter() - start, str(err)
@@ -0,0 +1,180 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("KANOON_CACHE_DIR", ".cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "kanoon_cache.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed);
+"""
+
+
+# SQLite-backed key/value store with size-bounded LRU eviction and optional TTL.
+# Several namespaces share one database file, which any number of processes can open.
+class DiskCache:
+    def __init__(self, namespace, max_bytes=256 * 1024 * 1024, ttl=None, path=CACHE_PATH):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.ttl = ttl or None
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    # One connection per thread; WAL lets readers in other processes proceed during writes
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, created FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        now = time.time()
+        if row is None:
+            self._count("misses")
+            return None
+        if self.ttl and now - row[1] > self.ttl:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._count("expired")
+            self._count("misses")
+            return None
+        conn.execute(
+            "UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?",
+            (now, self.namespace, key),
+        )
+        self._count("hits")
+        return row[0]
+
+    def set(self, key, value):
+        size = len(value.encode("utf8") if isinstance(value, str) else value)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.namespace, key, value, size, now, now),
+        )
+        self._count("writes")
+        self._evict(conn)
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    # Drop least recently used entries until the namespace fits in max_bytes
+    def _evict(self, conn):
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        evicted = 0
+        rows = conn.execute(
+            "SELECT key, size FROM entries WHERE namespace = ? ORDER BY accessed", (self.namespace,)
+        ).fetchall()
+        victims = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((self.namespace, key))
+            excess -= size
+            evicted += 1
+        conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+        self._count("evictions", evicted)
+
+    # All live (key, value) pairs in the namespace, e.g. to rebuild an in-memory index
+    def items(self):
+        query = "SELECT key, value FROM entries WHERE namespace = ?"
+        params = [self.namespace]
+        if self.ttl:
+            query += " AND created >= ?"
+            params.append(time.time() - self.ttl)
+        return self._connect().execute(query, params).fetchall()
+
+    def purge(self):
+        self._connect().execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(
+            namespace=self.namespace,
+            entries=entries,
+            bytes=size,
+            hit_rate=stats["hits"] / lookups if lookups else 0.0,
+        )
+        return stats
+
+
+# All namespaces present in the cache database
+def namespaces(path=CACHE_PATH):
+    if not os.path.exists(path):
+        return []
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT namespace FROM entries ORDER BY namespace")]
+
+
+# Admin command:
+#   python disk_cache.py stats
+#   python disk_cache.py purge document_analysis [more namespaces...]
+#   python disk_cache.py purge --all
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or purge the Kanoon ki Pehchaan disk cache")
+    parser.add_argument("--path", default=CACHE_PATH, help="cache database (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="entries and bytes per namespace")
+    purge = commands.add_parser("purge", help="delete every entry in the given namespaces")
+    purge.add_argument("namespaces", nargs="*")
+    purge.add_argument("--all", action="store_true", help="purge every namespace")
+    args = parser.parse_args(argv)
+
+    existing = namespaces(args.path)
+    if args.command == "stats":
+        for namespace in existing:
+            stats = DiskCache(namespace, path=args.path).stats()
+            print(f"{namespace:24} {stats['entries']:8d} entries {stats['bytes'] / 1024 / 1024:10.1f} MB")
+        return 0
+    targets = existing if args.all else args.namespaces
+    if not targets:
+        parser.error("name at least one namespace or pass --all")
+    for namespace in targets:
+        cache = DiskCache(namespace, path=args.path)
+        entries = cache.stats()["entries"]
+        cache.purge()
+        print(f"purged {namespace}: {entries} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import chains
+from context_packer import estimate_tokens
+from disk_cache import DiskCache
+from schemas import KeyPoint, Summary, DocumentAnalysis
+
+DOC_CHUNK_TOKENS = int(os.getenv("DOC_CHUNK_TOKENS", "8000"))
+DOC_CHUNK_OVERLAP = int(os.getenv("DOC_CHUNK_OVERLAP", "400"))
+DOC_ANALYSIS_WORKERS = int(os.getenv("DOC_ANALYSIS_WORKERS", "4"))
+DOC_ANALYSIS_CACHE_MB = int(os.getenv("DOC_ANALYSIS_CACHE_MB", "128"))
+DOC_ANALYSIS_CACHE_TTL = float(os.getenv("DOC_ANALYSIS_CACHE_TTL", "0"))
+
+_analysis_cache = None
+
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+_SENTENCES = re.compile(r"(?<=[.;:?!])\s+")
+
+
+# Paragraphs (or sentences of oversized paragraphs) with their estimated token counts
+def _units(text, max_tokens):
+    for paragraph in _PARAGRAPHS.split(text):
+        tokens = estimate_tokens(paragraph)
+        if not tokens:
+            continue
+        if tokens <= max_tokens:
+            yield paragraph, tokens
+            continue
+        for sentence in _SENTENCES.split(paragraph):
+            sentence_tokens = estimate_tokens(sentence)
+            # A run-on "sentence" longer than a chunk is cut by characters
+            while sentence_tokens > max_tokens:
+                cut = len(sentence) * max_tokens // sentence_tokens
+                yield sentence[:cut], estimate_tokens(sentence[:cut])
+                sentence = sentence[cut:]
+                sentence_tokens = estimate_tokens(sentence)
+            if sentence_tokens:
+                yield sentence, sentence_tokens
+
+
+# The end of a unit within budget tokens: its trailing whole sentences, or when even the last
+# sentence is too long, its trailing words
+def _tail(unit, budget):
+    kept, kept_tokens = [], 0
+    for sentence in reversed(_SENTENCES.split(unit)):
+        tokens = estimate_tokens(sentence)
+        if kept_tokens + tokens <= budget:
+            kept.insert(0, sentence)
+            kept_tokens += tokens
+            continue
+        if not kept and tokens:
+            words = sentence[-(len(sentence) * budget // tokens):].split(" ")[1:]
+            while words and estimate_tokens(" ".join(words)) > budget:
+                words = words[len(words) // 10 + 1:]
+            kept = [" ".join(words)] if words else []
+        break
+    tail = " ".join(kept)
+    return tail, estimate_tokens(tail)
+
+
+# Split text into chunks of at most max_tokens; each chunk repeats roughly overlap_tokens
+# from the end of the previous one so statements spanning a boundary are seen whole.
+def chunk_text(text, max_tokens=DOC_CHUNK_TOKENS, overlap_tokens=DOC_CHUNK_OVERLAP):
+    chunks, current, current_tokens = [], [], 0
+    for unit, tokens in _units(text, max_tokens):
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(u for u, _ in current))
+            carried, carried_tokens = [], 0
+            for u, t in reversed(current):
+                budget = min(overlap_tokens, max_tokens - tokens) - carried_tokens
+                if t > budget:
+                    # A unit larger than what is left of the overlap contributes its end
+                    tail, tail_tokens = _tail(u, budget) if budget > 0 else ("", 0)
+                    if tail:
+                        carried.insert(0, (tail, tail_tokens))
+                        carried_tokens += tail_tokens
+                    break
+                carried.insert(0, (u, t))
+                carried_tokens += t
+            current, current_tokens = carried, carried_tokens
+        current.append((unit, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(u for u, _ in current))
+    return chunks
+
+
+# Fallback merge when the reduce call fails: joined summaries and de-duplicated key points
+def merge_analyses(analyses):
+    seen, key_points = set(), []
+    for analysis in analyses:
+        for key_point in analysis.key_points:
+            normalized = " ".join(key_point.point.lower().split())
+            if normalized not in seen:
+                seen.add(normalized)
+                key_points.append(KeyPoint(point=key_point.point))
+    summary = " ".join(analysis.summary.summary for analysis in analyses)
+    return DocumentAnalysis(key_points=key_points, summary=Summary(summary=summary))
+
+
+def _format_partials(analyses):
+    parts = []
+    for i, analysis in enumerate(analyses, start=1):
+        parts.append(f"SECTION {i} SUMMARY: {analysis.summary.summary}\n")
+        parts.extend(f"- {key_point.point}\n" for key_point in analysis.key_points)
+        parts.append("\n")
+    return "".join(parts)
+
+
+# Analyze text of any length. Short texts take one call; long ones are chunked, the chunks
+# analyzed concurrently on up to max_workers threads, and the partial results merged.
+# on_progress(done, total) is called from the calling thread as chunks complete, then once
+# more after the merge, so it may safely update Streamlit elements.
+def analyze_text_structured(text, max_workers=DOC_ANALYSIS_WORKERS, on_progress=None,
+                            max_tokens=DOC_CHUNK_TOKENS, overlap_tokens=DOC_CHUNK_OVERLAP):
+    chunks = chunk_text(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens) or [text]
+    total = len(chunks) + (1 if len(chunks) > 1 else 0)
+    chain = chains.get_chain("document_analysis")
+    if len(chunks) == 1:
+        analysis = chain.invoke({"text": chunks[0]})
+        if on_progress:
+            on_progress(1, 1)
+        return analysis
+
+    partials = [None] * len(chunks)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="doc-map") as executor:
+        futures = {executor.submit(chain.invoke, {"text": chunk}): i for i, chunk in enumerate(chunks)}
+        for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            partials[futures[future]] = future.result()
+            if on_progress:
+                on_progress(done, total)
+
+    # Merged partials stay far smaller than the chunks; if they still overflow, fold them pairwise first
+    while len(partials) > 1 and estimate_tokens(_format_partials(partials)) > max_tokens:
+        partials = [merge_analyses(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+    try:
+        analysis = chains.get_chain("document_reduce").invoke({"text": _format_partials(partials)})
+    except Exception:
+        analysis = merge_analyses(partials)
+    if on_progress:
+        on_progress(total, total)
+    return analysis
+
+
+# Everything besides the PDF bytes that changes the analysis; bumping any of it misses the cache
+def analysis_version():
+    payload = json.dumps([
+        chains.DOCUMENT_PROMPT_TEMPLATE,
+        chains.DOCUMENT_REDUCE_PROMPT_TEMPLATE,
+        sorted(chains.DOCUMENT_MODEL.items()),
+        DOC_CHUNK_TOKENS,
+        DOC_CHUNK_OVERLAP,
+    ])
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()[:16]
+
+
+def get_analysis_cache():
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = DiskCache(
+            "document_analysis", max_bytes=DOC_ANALYSIS_CACHE_MB * 1024 * 1024, ttl=DOC_ANALYSIS_CACHE_TTL
+        )
+    return _analysis_cache
+
+
+# analyze_text_structured behind a persistent cache keyed by the SHA-256 of the PDF bytes.
+# Returns the analysis and whether it came from the cache.
+def analyze_pdf_cached(pdf_sha256, text, **kwargs):
+    cache = get_analysis_cache()
+    key = f"{pdf_sha256}:{analysis_version()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return DocumentAnalysis.model_validate_json(cached), True
+    analysis = analyze_text_structured(text, **kwargs)
+    cache.set(key, analysis.model_dump_json())
+    return analysis, False
@@ -0,0 +1,170 @@
+import bisect
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Point FIREBASE_AUTH_EMULATOR_HOST (e.g. "localhost:9099") at the Auth emulator for local load
+# tests, or FIREBASE_AUTH_URL at any other identitytoolkit-compatible endpoint.
+FIREBASE_AUTH_EMULATOR_HOST = os.getenv("FIREBASE_AUTH_EMULATOR_HOST")
+FIREBASE_AUTH_URL = os.getenv(
+    "FIREBASE_AUTH_URL",
+    f"http://{FIREBASE_AUTH_EMULATOR_HOST}/identitytoolkit.googleapis.com/v1" if FIREBASE_AUTH_EMULATOR_HOST
+    else "https://identitytoolkit.googleapis.com/v1",
+)
+FIREBASE_TOKEN_URL = os.getenv(
+    "FIREBASE_TOKEN_URL",
+    f"http://{FIREBASE_AUTH_EMULATOR_HOST}/securetoken.googleapis.com/v1" if FIREBASE_AUTH_EMULATOR_HOST
+    else "https://securetoken.googleapis.com/v1",
+)
+FIREBASE_CONNECT_TIMEOUT = float(os.getenv("FIREBASE_CONNECT_TIMEOUT", "3.05"))
+FIREBASE_READ_TIMEOUT = float(os.getenv("FIREBASE_READ_TIMEOUT", "10"))
+FIREBASE_RETRIES = int(os.getenv("FIREBASE_RETRIES", "2"))
+FIREBASE_POOL_SIZE = int(os.getenv("FIREBASE_POOL_SIZE", "10"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Upper bounds of the latency histogram buckets, in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    # Upper bound of the bucket holding the p-th percentile
+    def percentile(self, p):
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        rank, seen = p / 100 * total, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return float(self.bounds[i]) if i < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        count = sum(self.counts)
+        labels = [f"<={bound}ms" for bound in self.bounds] + [f">{self.bounds[-1]}ms"]
+        return {
+            "count": count,
+            "mean_ms": self.total_ms / count if count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+# Firebase Auth REST client shared by every session: one pooled requests.Session with connect
+# and read timeouts, bounded retries with jittered exponential backoff, and a latency histogram
+# per endpoint. Idempotent calls retry on 429/5xx and connection failures; other calls (e.g. the
+# reset email) only retry connect timeouts, where the request never reached Firebase.
+class FirebaseAuthClient:
+    def __init__(self, api_key, base_url=FIREBASE_AUTH_URL, connect_timeout=FIREBASE_CONNECT_TIMEOUT,
+                 read_timeout=FIREBASE_READ_TIMEOUT, retries=FIREBASE_RETRIES, backoff=0.25, max_backoff=4.0,
+                 pool_size=FIREBASE_POOL_SIZE):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def _delay(self, attempt, response=None):
+        retry_after = response is not None and response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # Full jitter, so clients that failed together do not retry together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _record(self, endpoint, ms, outcome):
+        with self._lock:
+            self._histograms.setdefault(endpoint, LatencyHistogram()).record(ms)
+            counters = self._counters.setdefault(endpoint, {})
+            counters[outcome] = counters.get(outcome, 0) + 1
+
+    # POST to an accounts endpoint (e.g. "accounts:signInWithPassword"), as JSON or, with
+    # form=True, form-encoded. Returns (status, json body); raises requests.RequestException
+    # once retries are spent. Pass idempotent=True only for calls that are safe to repeat.
+    def post(self, endpoint, payload, base_url=None, form=False, idempotent=False):
+        url = f"{(base_url or self.base_url).rstrip('/')}/{endpoint}"
+        body = {"data": payload} if form else {"json": payload}
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, params={"key": self.api_key}, timeout=self.timeout, **body)
+            except requests.RequestException as e:
+                self._record(endpoint, (time.perf_counter() - start) * 1000, type(e).__name__)
+                # A connect timeout means the request never left, so it is always retried. Other
+                # connection errors can happen after the body was sent (e.g. the connection dropped
+                # before the response), so only idempotent calls retry those; read timeouts never retry.
+                retry = isinstance(e, requests.exceptions.ConnectTimeout) or (
+                    idempotent and isinstance(e, requests.ConnectionError)
+                )
+                if not retry or attempt == self.retries:
+                    raise
+                time.sleep(self._delay(attempt))
+                continue
+            self._record(endpoint, (time.perf_counter() - start) * 1000, str(response.status_code))
+            # A 429/5xx reply means Firebase saw the request and may have acted on it
+            if idempotent and response.status_code in RETRY_STATUSES and attempt < self.retries:
+                time.sleep(self._delay(attempt, response))
+                continue
+            try:
+                data = response.json()
+            except ValueError:
+                data = {"error": {"message": f"HTTP {response.status_code}"}}
+            return response.status_code, data
+
+    def sign_in_with_password(self, email, password):
+        return self.post(
+            "accounts:signInWithPassword", {"email": email, "password": password, "returnSecureToken": True},
+            idempotent=True,
+        )
+
+    def send_password_reset(self, email):
+        return self.post("accounts:sendOobCode", {"email": email, "requestType": "PASSWORD_RESET"})
+
+    # Exchange a refresh token for a new ID token (and possibly a new refresh token)
+    def refresh(self, refresh_token):
+        return self.post(
+            "token", {"grant_type": "refresh_token", "refresh_token": refresh_token},
+            base_url=FIREBASE_TOKEN_URL, form=True, idempotent=True,
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                endpoint: dict(histogram.snapshot(), outcomes=dict(self._counters.get(endpoint, {})))
+                for endpoint, histogram in self._histograms.items()
+            }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(api_key):
+    global _client
+    with _client_lock:
+        if _client is None or _client.api_key != api_key:
+            _client = FirebaseAuthClient(api_key)
+        return _client
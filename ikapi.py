@@ -0,0 +1,246 @@
+import http.client
+import gzip
+import concurrent.futures
+import os
+import queue
+import re
+import threading
+import urllib.parse
+import time
+import unicodedata
+import zlib
+
+
+# Thread-safe pool of persistent HTTPS connections to a single host
+class HTTPSConnectionPool:
+    def __init__(self, host, maxsize=8, connect_timeout=5.0, read_timeout=30.0):
+        self.host = host
+        self.maxsize = maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = queue.LifoQueue(maxsize)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hits": 0, "misses": 0, "discarded": 0, "errors": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _checkout(self):
+        try:
+            conn = self._idle.get_nowait()
+            self._count("hits")
+            return conn, True
+        except queue.Empty:
+            self._count("misses")
+            return http.client.HTTPSConnection(self.host, timeout=self.connect_timeout), False
+
+    def _checkin(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._count("discarded")
+            conn.close()
+
+    def _send(self, conn, method, url, headers):
+        if conn.sock is None:
+            conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        conn.request(method, url, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        return response, body
+
+    def request(self, method, url, headers=None):
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
+        headers.setdefault("Connection", "keep-alive")
+        self._count("requests")
+        conn, reused = self._checkout()
+        try:
+            response, body = self._send(conn, method, url, headers)
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if not reused:
+                self._count("errors")
+                raise
+            # An idle keep-alive connection may have been closed by the server; retry once on a fresh one
+            self._count("misses")
+            conn = http.client.HTTPSConnection(self.host, timeout=self.connect_timeout)
+            try:
+                response, body = self._send(conn, method, url, headers)
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                self._count("errors")
+                raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._checkin(conn)
+        encoding = (response.getheader("Content-Encoding") or "").lower()
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        return response.status, body
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["idle"] = self._idle.qsize()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# Statute names and abbreviations folded to one canonical token
+_STATUTE_ALIASES = [
+    (r"\bindian penal code\b|\bi\s*\.?\s*p\s*\.?\s*c\b\.?", "ipc"),
+    (r"\bcode of criminal procedure\b|\bcr\s*\.?\s*p\s*\.?\s*c\b\.?", "crpc"),
+    (r"\bcode of civil procedure\b|\bc\s*\.?\s*p\s*\.?\s*c\b\.?", "cpc"),
+    (r"\bindian evidence act\b", "iea"),
+    (r"\bbharatiya nyaya sanhita\b", "bns"),
+    (r"\bbharatiya nagarik suraksha sanhita\b", "bnss"),
+    (r"\bconstitution of india\b|\bindian constitution\b", "constitution"),
+]
+_SECTION_ALIASES = [
+    (r"\bu\s*/\s*s\b\.?|\bsec\b\.?|\bs\.(?=\s*\d)|\bsections\b", "section"),
+    (r"\bart\b\.?|\barticles\b", "article"),
+]
+_STOPWORDS = frozenset(
+    "a an the of in on under for to and or is are was what which who whom how when where why "
+    "does do did can could should would will shall be been with by about from as at it this that "
+    "me my i we our you your please tell explain".split()
+)
+_STATUTES = frozenset(r for _, r in _STATUTE_ALIASES)
+_ALIAS_REPLACEMENTS = [f" {r} " for _, r in _STATUTE_ALIASES + _SECTION_ALIASES]
+# One pass over the text; the lookahead lists every alias's first letter so most words are rejected at once
+_ALIASES = re.compile(
+    r"\b(?=[abcisu])(?:" + "|".join(f"({p})" for p, _ in _STATUTE_ALIASES + _SECTION_ALIASES) + ")"
+)
+# After a section or article reference, "498 A" (capital letter, not an initial like "302 I.P.C.")
+# and "498-A" / "498-a" become "498a". Other numbers are left alone, so "1998 A Division" stays.
+_SECTION_SUFFIX = re.compile(
+    r"((?i:\b(?:sections?|sec|articles?|art|u\s*/\s*s)\b\.?|\bs\.)\s*)"
+    r"(\d+)(?:\s+([A-Z])\b(?!\.)|\s*-\s*([A-Za-z])\b)"
+)
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+# Lowercased text with statute names, section/article spellings and "498-A" style suffixes
+# folded to canonical forms. Shared by query normalization and passage ranking.
+def canonical_text(text):
+    text = unicodedata.normalize("NFKC", text)
+    text = _SECTION_SUFFIX.sub(lambda m: m.group(1) + m.group(2) + (m.group(3) or m.group(4)), text).lower()
+    return _ALIASES.sub(lambda m: _ALIAS_REPLACEMENTS[m.lastindex - 1], text)
+
+
+# Canonical tokens of text with punctuation and stopwords removed
+def legal_tokens(text, canonical=False):
+    if not canonical:
+        text = canonical_text(text)
+    return [token for token in _NON_WORD.split(text) if token and token not in _STOPWORDS]
+
+
+# Canonical form of a search query, so near-identical questions share one cache entry.
+# "IPC Section 498-A" and "section 498a of the indian penal code" both become "section 498a ipc".
+# Word order is otherwise kept, so "ipc 420 crpc 41" and "ipc 420 41 crpc" stay distinct.
+def normalize_query(query):
+    tokens = legal_tokens(query)
+    normalized = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        # A statute named just before "section N" / "article N" moves behind the number it qualifies
+        if (token in _STATUTES and i + 2 < len(tokens) and tokens[i + 1] in ("section", "article")
+                and tokens[i + 2][:1].isdigit()):
+            normalized += [tokens[i + 1], tokens[i + 2], token]
+            i += 3
+            continue
+        if not normalized or normalized[-1] != token:
+            normalized.append(token)
+        i += 1
+    return " ".join(normalized)
+
+
+# Indian Kanoon API wrapper
+class IKApi:
+    def __init__(self, token, pool=None, doc_store=None, search_cache=None):
+        self.headers = {'Authorization': f'Token {token}', 'Accept': 'application/json'}
+        self.basehost = 'api.indiankanoon.org'
+        self.pool = pool or HTTPSConnectionPool(
+            self.basehost,
+            maxsize=int(os.getenv("IK_POOL_SIZE", "8")),
+            connect_timeout=float(os.getenv("IK_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("IK_READ_TIMEOUT", "30")),
+        )
+        # Optional DiskCache of documents keyed by tid, consulted before the network
+        self.doc_store = doc_store
+        # Optional DiskCache of search results keyed by normalized query and page window
+        self.search_cache = search_cache
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.pool.maxsize, thread_name_prefix="ikapi"
+        )
+
+    def _get(self, url):
+        status, body = self.pool.request('GET', url, headers=self.headers)
+        return status, body.decode('utf8')
+
+    def call_api(self, url):
+        return self._get(url)[1]
+
+    def search(self, query, pagenum=0, maxpages=1):
+        cache_key = f'{normalize_query(query)}|{pagenum}|{maxpages}'
+        if self.search_cache is not None:
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        query = urllib.parse.quote_plus(query.encode('utf8'))
+        url = f'/search/?formInput={query}&pagenum={pagenum}&maxpages={maxpages}'
+        status, results = self._get(url)
+        if self.search_cache is not None and status == 200 and '"errmsg"' not in results[:200]:
+            self.search_cache.set(cache_key, results)
+        return results
+
+    def get_document(self, doc_id):
+        if self.doc_store is not None:
+            cached = self.doc_store.get(str(doc_id))
+            if cached is not None:
+                return cached
+        url = f'/doc/{doc_id}/'
+        status, document = self._get(url)
+        if self.doc_store is not None and status == 200 and '"errmsg"' not in document[:200]:
+            self.doc_store.set(str(doc_id), document)
+        return document
+
+    # Fetch several documents in parallel; anything not back by the deadline is left out
+    def get_documents(self, doc_ids, deadline=None):
+        start = time.monotonic()
+        futures = {self.executor.submit(self.get_document, doc_id): doc_id for doc_id in doc_ids}
+        done, pending = concurrent.futures.wait(futures, timeout=deadline)
+        for future in pending:
+            future.cancel()
+        results, errors = {}, {}
+        for future in done:
+            doc_id = futures[future]
+            try:
+                results[doc_id] = future.result()
+            except Exception as e:
+                errors[doc_id] = e
+        timed_out = [futures[future] for future in pending]
+        return results, errors, timed_out, time.monotonic() - start
+
+    def stats(self):
+        stats = {"pool": self.pool.stats()}
+        if self.doc_store is not None:
+            stats["documents"] = self.doc_store.stats()
+        if self.search_cache is not None:
+            stats["search"] = self.search_cache.stats()
+        return stats
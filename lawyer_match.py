@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+import numpy as np
+from collections import Counter
+from ikapi import legal_tokens
+import db
+
+logger = logging.getLogger(__name__)
+
+LAWYER_INDEX_TTL = float(os.getenv("LAWYER_INDEX_TTL", "3600"))
+
+# Profile fields that describe what a lawyer does, and how much a word in each one counts
+MATCH_FIELDS = {"myQualifications": 2.0, "degree": 1.0, "college": 0.5, "social_media": 0.25}
+
+
+def profile_terms(profile):
+    terms = Counter()
+    for field, weight in MATCH_FIELDS.items():
+        for token in legal_tokens(profile.get(field) or ""):
+            terms[token] += weight
+    return terms
+
+
+# TF-IDF (BM25 weighted) index over lawyer profiles for ranking lawyers against a case description.
+# Postings are kept per term, so a profile change only touches that profile's terms, and a query
+# scores every lawyer with one vectorized update per query term.
+class LawyerIndex:
+    def __init__(self, k1=1.2, b=0.5):
+        self.k1 = k1
+        self.b = b
+        self.names = []
+        self.slots = {}
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.total_length = 0.0
+        self.count = 0
+        self._terms = {}
+        self._postings = {}
+        self._arrays = {}
+        self._free = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_profiles(cls, profiles, **kwargs):
+        index = cls(**kwargs)
+        for profile in profiles:
+            index.upsert(profile)
+        return index
+
+    def __len__(self):
+        return self.count
+
+    def _slot(self, name):
+        if self._free:
+            slot = self._free.pop()
+            self.names[slot] = name
+        else:
+            slot = len(self.names)
+            self.names.append(name)
+            if slot >= len(self.lengths):
+                self.lengths = np.concatenate([self.lengths, np.zeros(max(slot, 64), dtype=np.float32)])
+        self.slots[name] = slot
+        self.count += 1
+        return slot
+
+    def _unlink(self, slot):
+        for term in self._terms.pop(slot, ()):
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+            self._arrays.pop(term, None)
+        self.total_length -= float(self.lengths[slot])
+        self.lengths[slot] = 0.0
+
+    # Add a profile or replace the indexed text of an existing one
+    def upsert(self, profile):
+        name = profile["name"]
+        terms = profile_terms(profile)
+        with self._lock:
+            slot = self.slots.get(name)
+            if slot is None:
+                slot = self._slot(name)
+            else:
+                self._unlink(slot)
+            for term, weight in terms.items():
+                self._postings.setdefault(term, {})[slot] = weight
+                self._arrays.pop(term, None)
+            self._terms[slot] = tuple(terms)
+            length = float(sum(terms.values()))
+            self.lengths[slot] = length
+            self.total_length += length
+
+    def remove(self, name):
+        with self._lock:
+            slot = self.slots.pop(name, None)
+            if slot is None:
+                return
+            self._unlink(slot)
+            self.names[slot] = None
+            self._free.append(slot)
+            self.count -= 1
+
+    # Postings of a term as (slots, weights) arrays, rebuilt only after the term changes
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def scores(self, text):
+        with self._lock:
+            size = len(self.names)
+            scores = np.zeros(size, dtype=np.float32)
+            if not self.count or not self.total_length:
+                return scores
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[:size] / (self.total_length / self.count))
+            for term in set(legal_tokens(text)):
+                if term not in self._postings:
+                    continue
+                slots, tf = self._term_arrays(term)
+                idf = np.log(1 + (self.count - len(slots) + 0.5) / (len(slots) + 0.5))
+                scores[slots] += idf * tf * (self.k1 + 1) / (tf + norm[slots])
+            return scores
+
+    # Best matching (score, name) pairs for a case description, highest first; lawyers whose
+    # profiles share no terms with it are left out
+    def top(self, text, k=10):
+        scores = self.scores(text)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        with self._lock:
+            return [(float(scores[slot]), self.names[slot]) for slot in order]
+
+
+_index = None
+_built = 0.0
+_index_lock = threading.Lock()
+_rebuilding = False
+# Profiles edited while a rebuild reads the table; re-applied to the new index before it is used
+_edited_during_rebuild = set()
+
+
+def _load_index():
+    fields = ", ".join(["name", *MATCH_FIELDS])
+    return LawyerIndex.from_profiles(db.fetch_all(f"SELECT {fields} FROM users"))
+
+
+def _rebuild():
+    global _index, _built, _rebuilding
+    try:
+        index = _load_index()
+        while True:
+            with _index_lock:
+                edited = set(_edited_during_rebuild)
+                _edited_during_rebuild.clear()
+                if not edited:
+                    _index, _built = index, time.time()
+                    return
+            for name in edited:
+                _refresh_profile(index, name)
+    except Exception as e:
+        logger.warning(f"Rebuilding the lawyer index failed: {e}")
+        # Keep serving the old index and try again in a minute
+        with _index_lock:
+            _built = time.time() - LAWYER_INDEX_TTL + 60
+    finally:
+        with _index_lock:
+            _rebuilding = False
+
+
+# Process-wide index over every profile, rebuilt from the database after LAWYER_INDEX_TTL so
+# edits made by other processes are picked up; edits in this process are applied at once
+# through update_profile. Only the very first build blocks: afterwards a stale index keeps
+# serving while a background thread builds its replacement, which is then swapped in.
+def get_index():
+    global _index, _built, _rebuilding
+    with _index_lock:
+        index = _index
+        if index is not None:
+            if time.time() - _built > LAWYER_INDEX_TTL and not _rebuilding:
+                _rebuilding = True
+                threading.Thread(target=_rebuild, daemon=True).start()
+            return index
+    index = _load_index()
+    with _index_lock:
+        if _index is None:
+            _index, _built = index, time.time()
+        return _index
+
+
+def _refresh_profile(index, name):
+    fields = ", ".join(["name", *MATCH_FIELDS])
+    profile = db.fetch_one(f"SELECT {fields} FROM users WHERE name = %s", (name,))
+    if profile is None:
+        index.remove(name)
+    else:
+        index.upsert(profile)
+
+
+# Re-read one profile and update the index in place
+def update_profile(name):
+    with _index_lock:
+        index = _index
+        if _rebuilding:
+            _edited_during_rebuild.add(name)
+    if index is None:
+        return
+    _refresh_profile(index, name)
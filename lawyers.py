@@ -0,0 +1,97 @@
+import os
+import db
+import thumbnails
+from memory_cache import TTLCache
+
+LAWYER_PAGE_SIZE = int(os.getenv("LAWYER_PAGE_SIZE", "20"))
+LAWYER_CACHE_SIZE = int(os.getenv("LAWYER_CACHE_SIZE", "2048"))
+LAWYER_CACHE_TTL = float(os.getenv("LAWYER_CACHE_TTL", "300"))
+
+# Columns the directory shows; named explicitly so rows never carry more than is rendered
+DIRECTORY_COLUMNS = ("name", "degree", "college", "myQualifications", "Phone_No", "social_media", "profile_pic_url")
+
+# Profiles change only when their owner saves, so pages read them from memory. Writers call
+# invalidate(name); the TTL bounds staleness for writes made by other processes.
+_profiles = TTLCache(maxsize=LAWYER_CACHE_SIZE, ttl=LAWYER_CACHE_TTL)
+# Directory pages by (after, limit). Any write may move rows between pages, so writes clear them all.
+_pages = TTLCache(maxsize=256, ttl=LAWYER_CACHE_TTL)
+
+
+# One page of the lawyer directory ordered by name, using keyset pagination: the next page
+# starts after the last name seen, so every page is an index range scan on name no matter how
+# deep the reader goes. Returns (rows, cursor); cursor is None on the last page.
+def directory_page(after=None, limit=LAWYER_PAGE_SIZE):
+    cached = _pages.get((after, limit))
+    if cached is not None:
+        return cached
+    query = f"SELECT {', '.join(DIRECTORY_COLUMNS)} FROM users"
+    params = []
+    if after is not None:
+        query += " WHERE name > %s"
+        params.append(after)
+    query += " ORDER BY name LIMIT %s"
+    # One extra row tells whether another page exists without a COUNT(*)
+    params.append(limit + 1)
+    rows = db.fetch_all(query, params)
+    cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        cursor = rows[-1]["name"]
+    for row in rows:
+        _profiles.set(row["name"], row)
+    _pages.set((after, limit), (rows, cursor))
+    return rows, cursor
+
+# Directory rows for the given names, in the order given (e.g. best match first).
+# Only names missing from the cache are read, in one query.
+def profiles(names):
+    found = {}
+    missing = []
+    for name in names:
+        row = _profiles.get(name)
+        if row is None:
+            missing.append(name)
+        else:
+            found[name] = row
+    if missing:
+        placeholders = ", ".join(["%s"] * len(missing))
+        rows = db.fetch_all(
+            f"SELECT {', '.join(DIRECTORY_COLUMNS)} FROM users WHERE name IN ({placeholders})", missing
+        )
+        for row in rows:
+            _profiles.set(row["name"], row)
+            found[row["name"]] = row
+    return [found[name] for name in names if name in found]
+
+
+# One lawyer's profile, or None if there is no such user
+def get_profile(name):
+    rows = profiles([name])
+    return rows[0] if rows else None
+
+
+# A user's profile with picture metadata for the profile and edit pages: one query on a
+# cache miss, and nothing at all when memo (a per-session dict) already holds it.
+# The "picture" entry is thumbnails.picture_info() of the stored path, or None.
+def load_profile(name, memo=None):
+    if memo is not None and name in memo:
+        return memo[name]
+    profile = get_profile(name)
+    if profile is not None:
+        profile = dict(profile, picture=thumbnails.picture_info(profile["profile_pic_url"]))
+        if memo is not None:
+            memo[name] = profile
+    return profile
+
+
+# Call after writing a user's row so no page serves the old profile; pass the writer's
+# session memo to drop its copy too
+def invalidate(name, memo=None):
+    _profiles.invalidate(name)
+    _pages.clear()
+    if memo is not None:
+        memo.pop(name, None)
+
+
+def cache_stats():
+    return {"profiles": _profiles.stats(), "pages": _pages.stats()}
@@ -0,0 +1,122 @@
+import argparse
+import hashlib
+import os
+import re
+import sys
+import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+_FILE_NAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_COMMENT = re.compile(r"^\s*--.*$", re.MULTILINE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+# (version, name, path, sql, checksum) for every file in migrations/, in version order
+def available(directory=MIGRATIONS_DIR):
+    migrations = []
+    for file_name in sorted(os.listdir(directory)):
+        match = _FILE_NAME.match(file_name)
+        if not match:
+            continue
+        path = os.path.join(directory, file_name)
+        with open(path, encoding="utf8") as f:
+            sql = f.read()
+        migrations.append((int(match.group(1)), match.group(2), path, sql, hashlib.sha256(sql.encode("utf8")).hexdigest()))
+    versions = [migration[0] for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError("two migration files share a version number")
+    return migrations
+
+
+# Statements of a migration file; files hold plain DDL/DML separated by semicolons
+def statements(sql):
+    return [statement.strip() for statement in _COMMENT.sub("", sql).split(";") if statement.strip()]
+
+
+# {version: checksum} of migrations already applied to the database behind conn
+def applied(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_SCHEMA)
+        cursor.execute("SELECT version, checksum FROM schema_migrations ORDER BY version")
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def pending(conn, directory=MIGRATIONS_DIR):
+    done = applied(conn)
+    migrations = available(directory)
+    for version, name, _, _, checksum in migrations:
+        if version in done and done[version] != checksum:
+            raise MigrationError(f"migration {version:04d}_{name} was edited after it was applied")
+    return [migration for migration in migrations if migration[0] not in done]
+
+
+# Apply pending migrations up to target (all by default), each recorded once it succeeds.
+# MySQL commits DDL implicitly, so a failing migration stops the run with the earlier ones kept.
+def migrate(conn, target=None, directory=MIGRATIONS_DIR, log=print):
+    ran = []
+    for version, name, _, sql, checksum in pending(conn, directory):
+        if target is not None and version > target:
+            break
+        log(f"applying {version:04d}_{name}")
+        cursor = conn.cursor()
+        try:
+            for statement in statements(sql):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (version, name, checksum),
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise MigrationError(f"migration {version:04d}_{name} failed: {e}") from e
+        finally:
+            cursor.close()
+        ran.append(version)
+    return ran
+
+
+# Admin command:
+#   python migrate.py status
+#   python migrate.py up [--to VERSION]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply Kanoon ki Pehchaan database migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="list applied and pending migrations")
+    up = commands.add_parser("up", help="apply pending migrations")
+    up.add_argument("--to", type=int, help="stop after this version")
+    args = parser.parse_args(argv)
+
+    with db.connection() as conn:
+        try:
+            if args.command == "status":
+                done = applied(conn)
+                for version, name, _, _, _ in available():
+                    print(f"{version:04d}_{name:40} {'applied' if version in done else 'pending'}")
+                return 0
+            ran = migrate(conn, target=args.to)
+        except MigrationError as e:
+            print(e, file=sys.stderr)
+            return 1
+    print(f"applied {len(ran)} migration(s)" if ran else "database is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
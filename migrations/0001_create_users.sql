@@ -0,0 +1,11 @@
+-- Lawyer profiles as the app has always used them: one row per user, keyed only by name in queries.
+-- Existing databases already have this table; the statement is a no-op there.
+CREATE TABLE IF NOT EXISTS users (
+    name VARCHAR(255),
+    degree VARCHAR(255),
+    college VARCHAR(255),
+    myQualifications TEXT,
+    Phone_No VARCHAR(32),
+    social_media VARCHAR(255),
+    profile_pic_url VARCHAR(512)
+);
@@ -0,0 +1,8 @@
+-- Surrogate primary key, and a unique index on name. Every profile read, update and the
+-- keyset-paginated directory (WHERE name > ? ORDER BY name) then use an index range instead
+-- of a full scan. Duplicate or NULL names must be cleaned up before this runs.
+ALTER TABLE users
+    ADD COLUMN id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT FIRST,
+    ADD PRIMARY KEY (id),
+    MODIFY name VARCHAR(255) NOT NULL,
+    ADD UNIQUE INDEX users_name (name);
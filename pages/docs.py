@@ -1,115 +1,86 @@
 import streamlit as st
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain.output_parsers import PydanticOutputParser
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from pydantic import BaseModel, Field
-from typing import List
 from dotenv import load_dotenv
-import os
 import time
-from datetime import datetime
-import PyPDF2
-from fpdf import FPDF
-from docx import Document
-import io
+import concurrent.futures
+import pdf_extract
+import chains
+import document_analysis
+import reports
+from reports import json_to_text
+from batch_jobs import BatchRunner, build_archive, BATCH_WORKERS, DONE, FAILED
 
 # Load environment variables
 load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
 
-# Initialize the language model
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", google_api_key=api_key)
+# Build (or reuse) the shared analysis chain in the background
+chains.warm_up()
 
-# Step 1: Define Pydantic Models for Structured Output
-class KeyPoint(BaseModel):
-    point: str = Field(description="A key point extracted from the document.")
+# Longest a script run waits on a report before showing it as still being prepared
+REPORT_WAIT_SECONDS = 0.5
+# How often the batch status refreshes while files are being analyzed
+BATCH_POLL_SECONDS = 1.0
 
-class Summary(BaseModel):
-    summary: str = Field(description="A brief summary of the document content.")
+# Function to extract text from a PDF file; cached by content hash (see pdf_extract.py)
+def extract_pdf_file(pdf_file):
+    data = pdf_file.getvalue() if hasattr(pdf_file, "getvalue") else pdf_file.read()
+    return pdf_extract.extract_pdf(data)
 
-class DocumentAnalysis(BaseModel):
-    key_points: List[KeyPoint] = Field(description="List of key points from the document.")
-    summary: Summary = Field(description="Summary of the document.")
+# Progress bar and per-file status table of a batch, as it stands right now
+def show_batch_status(runner):
+    counts = runner.counts()
+    st.progress(
+        runner.progress(),
+        text=f"{counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, {len(runner.jobs)} files"
+    )
+    st.dataframe(
+        [
+            {
+                "File": job.name,
+                "Status": job.status + (" (cached)" if job.from_cache else ""),
+                "Progress": job.progress,
+                "Pages": job.pages,
+                "Time (s)": round(job.seconds, 1),
+                "Error": job.error or "",
+            }
+            for job in runner.jobs
+        ],
+        column_config={"Progress": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0)},
+        hide_index=True,
+        use_container_width=True,
+    )
 
-# Step 2: Set Up LangChain with Output Parsing
-parser = PydanticOutputParser(pydantic_object=DocumentAnalysis)
+# Rendered as a fragment every BATCH_POLL_SECONDS while the batch runs; once it finishes the
+# whole page reruns to show the results download
+def watch_batch(runner):
+    show_batch_status(runner)
+    if runner.done():
+        st.rerun()
 
-# Define the prompt with instructions for the LLM
-prompt_template = """
-Analyze the following text and extract key points and a summary.
-{format_instructions}
-Text: {text}
-"""
-prompt = PromptTemplate(
-    template=prompt_template,
-    input_variables=["text"],
-    partial_variables={"format_instructions": parser.get_format_instructions()}
-)
-
-# Step 3: Chain the Components Together
-chain = LLMChain(llm=llm, prompt=prompt, output_parser=parser)
-
-# Function to analyze text and return structured data
-def analyze_text_structured(text):
-    output = chain.run(text=text)
-    return output
-
-# Function to extract text from a PDF file
-def extract_text_from_pdf(pdf_file):
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-# Function to convert JSON to text format
-def json_to_text(analysis):
-    """
-    Convert the structured JSON analysis into a simple text format.
-    """
-    text_output = ""
-
-    # Add summary
-    text_output += "=== Summary ===\n"
-    text_output += f"{analysis.summary.summary}\n\n"
-
-    # Add key points
-    text_output += "=== Key Points ===\n"
-    for i, key_point in enumerate(analysis.key_points, start=1):
-        text_output += f"{i}. {key_point.point}\n"
-
-    return text_output
-
-# Function to create a PDF report from the analysis
-def create_pdf_report(analysis):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font('Helvetica', '', 12)
-    pdf.cell(200, 10, txt="PDF Analysis Report", ln=True, align='C')
-    pdf.cell(200, 10, txt=f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
-    
-    # Convert JSON to text
-    clean_text = json_to_text(analysis)
-    pdf.multi_cell(0, 10, txt=clean_text)
-    return pdf.output(dest='S')  # Return PDF as bytes
-
-# Function to create a Word report from the analysis
-def create_word_report(analysis):
-    doc = Document()
-    doc.add_heading('PDF Analysis Report', 0)
-    doc.add_paragraph(f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-    
-    # Convert JSON to text
-    clean_text = json_to_text(analysis)
-    doc.add_heading('Analysis', level=1)
-    doc.add_paragraph(clean_text)
-    
-    docx_bytes = io.BytesIO()
-    doc.save(docx_bytes)
-    docx_bytes.seek(0)
-    return docx_bytes.getvalue()
+# Report download for the format the user picks. The report is built on a background worker
+# (memoized per analysis and format); until it is ready only this fragment reruns to check on it.
+@st.fragment
+def report_download(analysis):
+    report_format = st.radio(
+        "Download report as", ["pdf", "docx"], index=None, horizontal=True,
+        format_func={"pdf": "PDF", "docx": "Word"}.get
+    )
+    if not report_format:
+        return
+    report = reports.request_report(analysis, report_format)
+    _, file_name, mime = reports.REPORT_FORMATS[report_format]
+    done, _ = concurrent.futures.wait([report], timeout=REPORT_WAIT_SECONDS)
+    if not done:
+        st.caption("Preparing report...")
+        st.rerun(scope="fragment")
+    if report.exception() is not None:
+        st.error(f"Could not build the report: {report.exception()}")
+        return
+    st.download_button(
+        label=f"Download {'PDF' if report_format == 'pdf' else 'Word'} Report",
+        data=report.result(),
+        file_name=file_name,
+        mime=mime
+    )
 
 # Streamlit app configuration
 st.set_page_config(page_title="Kanoon ki Pehchaan", page_icon="⚖️")
@@ -206,10 +177,8 @@ if "pdf_summary" not in st.session_state:
     st.session_state.pdf_summary = None
 if "analysis_time" not in st.session_state:
     st.session_state.analysis_time = 0
-if "pdf_report" not in st.session_state:
-    st.session_state.pdf_report = None
-if "word_report" not in st.session_state:
-    st.session_state.word_report = None
+if "from_cache" not in st.session_state:
+    st.session_state.from_cache = False
 
 # Header and title
 st.markdown('<div class="main-header">', unsafe_allow_html=True)
@@ -218,41 +187,76 @@ st.title("⚖️ Kanoon ki Pehchaan")
 st.caption("Your AI-powered Legal Document Analyzer")
 st.markdown('</div>', unsafe_allow_html=True)
 
+single_tab, batch_tab = st.tabs(["Single Document", "Batch"])
+
 # File uploader and analysis logic
-st.markdown('<div class="card animate-fadeIn">', unsafe_allow_html=True)
-uploaded_file = st.file_uploader("Upload a PDF file", type="pdf")
-if uploaded_file is not None:
-    if st.session_state.current_file != uploaded_file.name:
-        st.session_state.current_file = uploaded_file.name
-        st.session_state.pdf_summary = None
-        st.session_state.pdf_report = None
-        st.session_state.word_report = None
-    text = extract_text_from_pdf(uploaded_file)
-    if st.button("Analyze Text"):
-        start_time = time.time()
-        with st.spinner("Analyzing..."):
-            analysis = analyze_text_structured(text)
-            st.session_state.pdf_summary = analysis
-            st.session_state.pdf_report = create_pdf_report(analysis)
-            st.session_state.word_report = create_word_report(analysis)
-        end_time = time.time()
-        st.session_state.analysis_time = end_time - start_time
+with single_tab:
+    st.markdown('<div class="card animate-fadeIn">', unsafe_allow_html=True)
+    uploaded_file = st.file_uploader("Upload a PDF file", type="pdf")
+    if uploaded_file is not None:
+        if st.session_state.current_file != uploaded_file.name:
+            st.session_state.current_file = uploaded_file.name
+            st.session_state.pdf_summary = None
+        extraction = extract_pdf_file(uploaded_file)
+        text = extraction.text
+        if extraction.cached:
+            st.caption(f"{extraction.page_count} pages (already extracted)")
+        elif extraction.page_seconds:
+            slowest = max(range(extraction.page_count), key=extraction.page_seconds.__getitem__)
+            st.caption(
+                f"Extracted {extraction.page_count} pages in {extraction.total_seconds:.2f}s "
+                f"(slowest: page {slowest + 1}, {extraction.page_seconds[slowest]:.2f}s)"
+            )
+        if st.button("Analyze Text"):
+            start_time = time.time()
+            progress = st.progress(0.0, text="Analyzing...")
+            def show_progress(done, total):
+                progress.progress(done / total, text=f"Analyzing... {done}/{total} parts done")
+            with st.spinner("Analyzing..."):
+                analysis, from_cache = document_analysis.analyze_pdf_cached(
+                    extraction.sha256, text, on_progress=show_progress
+                )
+                progress.empty()
+                st.session_state.pdf_summary = analysis
+                st.session_state.from_cache = from_cache
+            end_time = time.time()
+            st.session_state.analysis_time = end_time - start_time
+
+    # Results stay on screen across reruns; a report is only built for the format the user picks
+    if uploaded_file is not None and st.session_state.pdf_summary is not None:
+        analysis = st.session_state.pdf_summary
         st.subheader("Analysis Results")
-        
+        if st.session_state.from_cache:
+            st.caption("This document was analyzed before; showing the saved analysis.")
+
         # Display analysis in text format
         st.text(json_to_text(analysis))
-        
-        st.download_button(
-            label="Download PDF Report",
-            data=st.session_state.pdf_report,
-            file_name="analysis_report.pdf",
-            mime="application/pdf"
+        report_download(analysis)
+
+# Batch mode: many PDFs analyzed on a bounded worker pool, with per-file status
+with batch_tab:
+    batch_files = st.file_uploader("Upload PDF files", type="pdf", accept_multiple_files=True, key="batch_files")
+    batch_workers = st.slider("Files analyzed at once", min_value=1, max_value=16, value=BATCH_WORKERS)
+    if batch_files and st.button("Analyze All"):
+        st.session_state.batch = BatchRunner(
+            [(batch_file.name, batch_file.getvalue()) for batch_file in batch_files], workers=batch_workers
         )
+        st.session_state.batch_archive = None
+    runner = st.session_state.get("batch")
+    if runner is not None and not runner.done():
+        # Only the status fragment reruns while the batch works; the rest of the page stays usable
+        st.fragment(run_every=BATCH_POLL_SECONDS)(watch_batch)(runner)
+    elif runner is not None:
+        show_batch_status(runner)
+        elapsed = runner.finished - runner.started
+        st.caption(f"Batch finished in {elapsed:.1f}s with {runner.workers} workers")
+        if st.session_state.get("batch_archive") is None:
+            st.session_state.batch_archive = build_archive(runner.jobs)
         st.download_button(
-            label="Download Word Report",
-            data=st.session_state.word_report,
-            file_name="analysis_report.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            label="Download All Results",
+            data=st.session_state.batch_archive,
+            file_name="batch_analysis.zip",
+            mime="application/zip"
         )
 st.markdown('</div>', unsafe_allow_html=True)
 
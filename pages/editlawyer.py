@@ -8,6 +8,11 @@ import os
 import logging
 from pathlib import Path
 import mysql.connector
+import db
+import lawyer_match
+import lawyers
+import thumbnails
+import auth_cookie
 
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -44,19 +49,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-def get_db_connection():
-    try:
-        return mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="0819",
-            database="lawyers"
-        )
-    except mysql.connector.Error as err:
-        logger.error(f"Database connection error: {err}")
-        st.error("Could not connect to database.")
-        return None
-
 def local_css():
     st.markdown("""
     <style>
@@ -141,7 +133,7 @@ def local_css():
 
 local_css()
 
-if not st.session_state.get('authenticated', False):
+if not auth_cookie.keep_alive(st.session_state):
     st.warning("You must be logged in to edit your profile.")
     st.page_link("Homepage.py", label="Login here", icon="🔑")
 else:
@@ -152,24 +144,21 @@ else:
     st.markdown('</div>', unsafe_allow_html=True)
 
     d = c = q = ph = sm = p_url = ""
+    profile_memo = st.session_state.setdefault("profiles", {})
     try:
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE name = %s", (username,))
-            users = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            if users:
-                user = users[0]
-                d = user.get('degree', '') or ""
-                c = user.get('college', '') or ""
-                q = user.get('myQualifications', '') or ""
-                ph = user.get('Phone_No', '') or ""
-                sm = user.get('social_media', '') or ""
-                p_url = user.get('profile_pic_url', '') or ""
-            else:
-                st.info("No profile data found. Let's create your profile!")
+        user = lawyers.load_profile(username, memo=profile_memo)
+        if user:
+            d = user.get('degree', '') or ""
+            c = user.get('college', '') or ""
+            q = user.get('myQualifications', '') or ""
+            ph = user.get('Phone_No', '') or ""
+            sm = user.get('social_media', '') or ""
+            p_url = user.get('profile_pic_url', '') or ""
+        else:
+            st.info("No profile data found. Let's create your profile!")
+    except mysql.connector.Error as err:
+        logger.error(f"Database connection error: {err}")
+        st.error("Could not connect to database.")
     except Exception as e:
         logger.error(f"Error fetching user data: {e}")
         st.error("Error retrieving your profile data.")
@@ -184,44 +173,37 @@ else:
     new_profile_pic = st.file_uploader("Update Profile Picture", type=["jpg", "png", "jpeg"])
     if st.button("Update Profile"):
         try:
-            conn = get_db_connection()
-            if conn:
-                cursor = conn.cursor()
-                update_fields = []
-                update_values = []
-                if new_degree:
-                    update_fields.append("degree = %s")
-                    update_values.append(new_degree)
-                if new_college:
-                    update_fields.append("college = %s")
-                    update_values.append(new_college)
-                if new_qualifications:
-                    update_fields.append("myQualifications = %s")
-                    update_values.append(new_qualifications)
-                if new_phone_no:
-                    update_fields.append("Phone_No = %s")
-                    update_values.append(new_phone_no)
-                if new_sm:
-                    update_fields.append("social_media = %s")
-                    update_values.append(new_sm)
-                if new_profile_pic:
-                    image_dir = "images"
-                    os.makedirs(image_dir, exist_ok=True)
-                    image_path = os.path.join(image_dir, f"{username}.jpg")
-                    with open(image_path, "wb") as f:
-                        f.write(new_profile_pic.read())
-                    update_fields.append("profile_pic_url = %s")
-                    update_values.append(image_path)
-                if update_fields:
-                    update_query = f"UPDATE users SET {', '.join(update_fields)} WHERE name = %s"
-                    update_values.append(username)
-                    cursor.execute(update_query, update_values)
-                    conn.commit()
-                    st.success("Profile updated successfully!")
-                else:
-                    st.info("No changes to update.")
-                cursor.close()
-                conn.close()
+            update_fields = []
+            update_values = []
+            if new_degree:
+                update_fields.append("degree = %s")
+                update_values.append(new_degree)
+            if new_college:
+                update_fields.append("college = %s")
+                update_values.append(new_college)
+            if new_qualifications:
+                update_fields.append("myQualifications = %s")
+                update_values.append(new_qualifications)
+            if new_phone_no:
+                update_fields.append("Phone_No = %s")
+                update_values.append(new_phone_no)
+            if new_sm:
+                update_fields.append("social_media = %s")
+                update_values.append(new_sm)
+            if new_profile_pic:
+                # Stored as resized thumbnails under a content-hashed name, not the raw upload
+                image_path = thumbnails.process_image(new_profile_pic.getvalue())
+                update_fields.append("profile_pic_url = %s")
+                update_values.append(image_path)
+            if update_fields:
+                update_query = f"UPDATE users SET {', '.join(update_fields)} WHERE name = %s"
+                update_values.append(username)
+                db.execute(update_query, update_values)
+                lawyers.invalidate(username, memo=profile_memo)
+                lawyer_match.update_profile(username)
+                st.success("Profile updated successfully!")
+            else:
+                st.info("No changes to update.")
         except Exception as e:
             logger.error(f"Error updating profile: {e}")
             st.error(f"Error updating profile: {str(e)}")
@@ -1,22 +1,45 @@
 import streamlit as st
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from langchain_core.utils.json import parse_json_markdown
+from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
 import time
+import concurrent.futures
+import hashlib
 from datetime import datetime
-import re
 import json
-import http.client
-import urllib.parse
+from ikapi import IKApi
+from disk_cache import DiskCache
+from answer_cache import AnswerCache
+from passages import PassageIndex
+from context_packer import pack_kanoon_context
+from query_classifier import is_indian_law_related
+from schemas import LegalAnalysis
+import chains
+import auth_cookie
 
 # Load environment variables
 load_dotenv()
 
+# Number of top search hits whose full documents are fetched, and the time budget for the whole
+# lookup (search plus document fetches)
+KANOON_TOP_N = int(os.getenv("KANOON_TOP_N", "3"))
+KANOON_FETCH_DEADLINE = float(os.getenv("KANOON_FETCH_DEADLINE", "8"))
+# Token budget for the Indian Kanoon section of the prompt
+KANOON_CONTEXT_TOKENS = int(os.getenv("KANOON_CONTEXT_TOKENS", "2000"))
+# Local document store limits; judgments rarely change so TTL is off unless set
+IK_DOC_CACHE_MB = int(os.getenv("IK_DOC_CACHE_MB", "512"))
+IK_DOC_CACHE_TTL = float(os.getenv("IK_DOC_CACHE_TTL", "0"))
+# Search results go stale as new judgments are indexed, so they expire after a day by default
+IK_SEARCH_CACHE_MB = int(os.getenv("IK_SEARCH_CACHE_MB", "64"))
+IK_SEARCH_CACHE_TTL = float(os.getenv("IK_SEARCH_CACHE_TTL", "86400"))
+# Gemini answer cache; the semantic near-duplicate tier is opt-in
+LLM_CACHE_MB = int(os.getenv("LLM_CACHE_MB", "256"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "604800"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "0") == "1"
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.92"))
+
 # Streamlit page configuration
 st.set_page_config(
     page_title="Kanoon ki Pehchaan",
@@ -130,21 +153,6 @@ def local_css():
 # Apply custom CSS
 local_css()
 
-# Pydantic models for structured output
-class LegalReference(BaseModel):
-    title: str = Field(description="Title of the legal document or case")
-    source: str = Field(description="Source of the document (court, statute, etc.)")
-    relevance: str = Field(description="Explanation of how this reference relates to the query")
-    key_points: List[str] = Field(description="Main legal points from this reference")
-    citation: Optional[str] = Field(None, description="Formal legal citation if available")
-
-class LegalAnalysis(BaseModel):
-    query_summary: str = Field(description="Concise summary of the legal question")
-    applicable_laws: List[str] = Field(description="List of applicable laws and sections")
-    key_principles: List[str] = Field(description="Key legal principles relevant to the query")
-    practical_implications: str = Field(description="Practical implications for the person asking")
-    references: List[LegalReference] = Field(description="Detailed references to relevant cases and statutes")
-
 # Initialize session state
 def init_session_state():
     if "messages" not in st.session_state:
@@ -155,80 +163,42 @@ def init_session_state():
         st.session_state.response_time = 0
     if "chat_started" not in st.session_state:
         st.session_state.chat_started = False
-    if "authenticated" not in st.session_state:
-        st.session_state.authenticated = True
+    if "stream_answers" not in st.session_state:
+        st.session_state.stream_answers = os.getenv("KANOON_STREAMING", "1") == "1"
 
-# Initialize the model
-@st.cache_resource
-def get_model():
-    try:
-        return ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0.2)
-    except Exception as e:
-        st.error(f"Failed to initialize model: {e}")
-        return None
-
-# Setup structured chain
+# Setup structured chain, built once per process
 def setup_structured_chain():
-    parser = PydanticOutputParser(pydantic_object=LegalAnalysis)
-    template = """
-    You are Kanoon ki Pehchaan, an AI legal expert specializing in Indian law.
-    
-    USER QUERY: {query}
-    
-    INDIAN KANOON DATA:
-    {kanoon_data}
-    
-    Your task is to analyze this query and the provided legal references from Indian Kanoon.
-    Provide a comprehensive legal analysis following the structured format below.
-    
-    {format_instructions}
-    
-    Make sure to properly cite any legal references and maintain a professional legal tone.
-    Include only factual information supported by the provided Indian Kanoon data or well-established legal principles.
-    """
-    prompt = ChatPromptTemplate.from_template(template).partial(
-        format_instructions=parser.get_format_instructions()
-    )
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0.2, max_output_tokens=4096)
-    chain = prompt | model | parser
-    return chain
+    return chains.get_chain("legal_analysis")
+
+# Setup streaming chain; the JSON is parsed incrementally by the caller
+def setup_streaming_chain():
+    return chains.get_chain("legal_analysis_stream")
 
-# Check if query is related to Indian law
-def is_indian_law_related(query):
-    if not query or not isinstance(query, str):
-        return False
-    query = query.lower()
-    indian_legal_keywords = ["indian", "india", "ipc", "crpc", "constitution", "section", "act", "law", "case", "statute", "article", "court"]
-    for keyword in indian_legal_keywords:
-        if keyword in query:
-            return True
-    patterns = [r"section \d+", r"article \d+", r"ipc \d+"]
-    for pattern in patterns:
-        if re.search(pattern, query, re.IGNORECASE):
-            return True
-    return False
+# Shared Indian Kanoon client, pooled across sessions
+@st.cache_resource
+def get_ikapi(token):
+    doc_store = DiskCache("ik_documents", max_bytes=IK_DOC_CACHE_MB * 1024 * 1024, ttl=IK_DOC_CACHE_TTL)
+    search_cache = DiskCache("ik_search", max_bytes=IK_SEARCH_CACHE_MB * 1024 * 1024, ttl=IK_SEARCH_CACHE_TTL)
+    return IKApi(token, doc_store=doc_store, search_cache=search_cache)
 
-# Indian Kanoon API wrapper
-class IKApi:
-    def __init__(self, token):
-        self.headers = {'Authorization': f'Token {token}', 'Accept': 'application/json'}
-        self.basehost = 'api.indiankanoon.org'
+# Shared Gemini answer cache
+@st.cache_resource
+def get_answer_cache():
+    store = DiskCache("llm_answers", max_bytes=LLM_CACHE_MB * 1024 * 1024, ttl=LLM_CACHE_TTL)
+    vector_store = None
+    if LLM_CACHE_SEMANTIC:
+        vector_store = DiskCache("llm_answer_vectors", max_bytes=LLM_CACHE_MB * 1024 * 1024, ttl=LLM_CACHE_TTL)
+    return AnswerCache(store, vector_store, threshold=LLM_CACHE_SIMILARITY)
 
-    def call_api(self, url):
-        connection = http.client.HTTPSConnection(self.basehost)
-        connection.request('GET', url, headers=self.headers)
-        response = connection.getresponse()
-        results = response.read().decode('utf8')
-        return results
+def get_cached_answer(query, formatted_kanoon_data):
+    cached = get_answer_cache().get(chains.LEGAL_PROMPT_TEMPLATE, chains.LEGAL_MODEL, query, formatted_kanoon_data)
+    return LegalAnalysis.model_validate_json(cached) if cached is not None else None
 
-    def search(self, query, pagenum=0, maxpages=1):
-        query = urllib.parse.quote_plus(query.encode('utf8'))
-        url = f'/search/?formInput={query}&pagenum={pagenum}&maxpages={maxpages}'
-        return self.call_api(url)
-    
-    def get_document(self, doc_id):
-        url = f'/doc/{doc_id}/'
-        return self.call_api(url)
+def cache_answer(query, formatted_kanoon_data, legal_analysis):
+    get_answer_cache().set(
+        chains.LEGAL_PROMPT_TEMPLATE, chains.LEGAL_MODEL, query, formatted_kanoon_data,
+        legal_analysis.model_dump_json()
+    )
 
 # Fetch data from Indian Kanoon
 def fetch_indian_kanoon_data(query):
@@ -236,89 +206,157 @@ def fetch_indian_kanoon_data(query):
     if not api_key:
         st.error("Indian Kanoon API key not found.")
         return None
-    ikapi = IKApi(api_key)
+    ikapi = get_ikapi(api_key)
+    start = time.monotonic()
     try:
-        search_results = ikapi.search(query)
+        # The search runs on the API's worker pool so a slow search cannot overrun the budget;
+        # if it does, it finishes in the background and fills the search cache for next time
+        try:
+            search_results = ikapi.executor.submit(ikapi.search, query).result(timeout=KANOON_FETCH_DEADLINE)
+        except concurrent.futures.TimeoutError:
+            st.warning(f"Indian Kanoon search took longer than {KANOON_FETCH_DEADLINE:g}s; answering without it.")
+            return None
         results_json = json.loads(search_results)
         if results_json.get("docs"):
-            for i, doc in enumerate(results_json["docs"][:3]):  
-                if doc.get("tid"):
-                    try:
-                        doc_content = ikapi.get_document(doc["tid"])
-                        if doc_content:
-                            results_json["docs"][i]["content"] = doc_content
-                    except Exception as e:
-                        results_json["docs"][i]["content"] = f"Error fetching content: {str(e)}"
+            top_docs = [doc for doc in results_json["docs"][:KANOON_TOP_N] if doc.get("tid")]
+            remaining = max(KANOON_FETCH_DEADLINE - (time.monotonic() - start), 0.0)
+            contents, errors, timed_out, _ = ikapi.get_documents([doc["tid"] for doc in top_docs], deadline=remaining)
+            for doc in top_docs:
+                content = contents.get(doc["tid"])
+                # Kanoon reports failures (e.g. quota exceeded) as an errmsg body; those are never indexed
+                if content and '"errmsg"' not in content[:200]:
+                    doc["content"] = content
+                elif doc["tid"] in errors:
+                    doc["error"] = f"Error fetching content: {str(errors[doc['tid']])}"
+                elif content:
+                    doc["error"] = "Error fetching content: Indian Kanoon returned an error"
+            if timed_out:
+                results_json["timed_out"] = timed_out
         return results_json
     except Exception as e:
         st.error(f"Failed to fetch data from Indian Kanoon: {e}")
         return None
 
+# Passage index per document, shared across sessions; keyed by a hash of the content so an
+# index is never reused for a different version of the document
+@st.cache_resource(max_entries=256)
+def get_passage_index(tid, content_hash, _content):
+    return PassageIndex.from_document(_content)
+
+# Format Indian Kanoon results as prompt context within the token budget.
+# Returns the context text and packing stats (including estimated tokens sent).
+def format_kanoon_data(query, kanoon_data):
+    return pack_kanoon_context(
+        query, kanoon_data,
+        index_for=lambda doc: get_passage_index(
+            doc["tid"], hashlib.sha256(doc["content"].encode("utf8")).hexdigest(), doc["content"]
+        ),
+        token_budget=KANOON_CONTEXT_TOKENS,
+        max_documents=KANOON_TOP_N,
+    )
+
+# Fallback analysis shown when Gemini fails
+def fallback_analysis(query, error):
+    return LegalAnalysis(
+        query_summary=query,
+        applicable_laws=["Could not parse detailed laws"],
+        key_principles=["Error in legal analysis"],
+        practical_implications=f"Error occurred during analysis: {str(error)}",
+        references=[]
+    )
+
 # Process legal query
 def process_legal_query(query, kanoon_data):
     start_time = time.time()
+    context_stats = None
     try:
-        formatted_kanoon_data = "No data found from Indian Kanoon."
-        if kanoon_data and kanoon_data.get("found", 0) > 0:
-            formatted_kanoon_data = f"Found {kanoon_data.get('found', 0)} results. Here are the top matches:\n\n"
-            for i, doc in enumerate(kanoon_data.get("docs", [])[:3]):
-                formatted_kanoon_data += f"DOCUMENT {i+1}:\n"
-                formatted_kanoon_data += f"Title: {doc.get('title', 'No title')}\n"
-                formatted_kanoon_data += f"Source: {doc.get('docsource', 'Unknown')}\n"
-                formatted_kanoon_data += f"Date: {doc.get('docdate', 'Unknown')}\n"
-                formatted_kanoon_data += f"Link: https://api.indiankanoon.org/doc/{doc.get('tid', '')}/\n"
-                if doc.get("content"):
-                    content_sample = doc["content"][:1000] + "..." if len(doc["content"]) > 1000 else doc["content"]
-                    formatted_kanoon_data += f"Excerpt: {content_sample}\n"
-                formatted_kanoon_data += "\n"
-        chain = setup_structured_chain()
-        result = chain.invoke({"query": query, "kanoon_data": formatted_kanoon_data})
+        formatted_kanoon_data, context_stats = format_kanoon_data(query, kanoon_data)
+        result = get_cached_answer(query, formatted_kanoon_data)
+        if result is None:
+            chain = setup_structured_chain()
+            result = chain.invoke({"query": query, "kanoon_data": formatted_kanoon_data})
+            cache_answer(query, formatted_kanoon_data, result)
         process_time = time.time() - start_time
-        return result, process_time
+        return result, process_time, context_stats
     except Exception as e:
         process_time = time.time() - start_time
         st.error(f"Error processing with Gemini: {str(e)}")
-        fallback_response = LegalAnalysis(
-            query_summary=query,
-            applicable_laws=["Could not parse detailed laws"],
-            key_principles=["Error in legal analysis"],
-            practical_implications=f"Error occurred during analysis: {str(e)}",
-            references=[]
-        )
-        return fallback_response, process_time
+        return fallback_analysis(query, e), process_time, context_stats
 
-# Format response for display
-def format_response_for_display(legal_analysis):
-    formatted_response = f"""
-### Query Summary
-{legal_analysis.query_summary}
+# Stream a legal query, rendering sections into placeholder as they are parsed.
+# Returns the analysis, time to first token, total time and context packing stats.
+def stream_legal_query(query, kanoon_data, placeholder):
+    start_time = time.time()
+    first_token_time = None
+    context_stats = None
+    text = ""
+    partial = None
+    try:
+        formatted_kanoon_data, context_stats = format_kanoon_data(query, kanoon_data)
+        cached = get_cached_answer(query, formatted_kanoon_data)
+        if cached is not None:
+            process_time = time.time() - start_time
+            return cached, process_time, process_time, context_stats
+        chain = setup_streaming_chain()
+        for chunk in chain.stream({"query": query, "kanoon_data": formatted_kanoon_data}):
+            if not chunk.content:
+                continue
+            if first_token_time is None:
+                first_token_time = time.time() - start_time
+            text += chunk.content
+            try:
+                parsed = parse_json_markdown(text)
+            except Exception:
+                continue
+            if isinstance(parsed, dict) and parsed != partial:
+                partial = parsed
+                placeholder.markdown(format_response_for_display(partial) + " ▌")
+        result = LegalAnalysis.model_validate(parse_json_markdown(text))
+        cache_answer(query, formatted_kanoon_data, result)
+    except Exception as e:
+        st.error(f"Error processing with Gemini: {str(e)}")
+        result = fallback_analysis(query, e)
+    process_time = time.time() - start_time
+    return result, first_token_time if first_token_time is not None else process_time, process_time, context_stats
 
-### Applicable Laws
-"""
-    for law in legal_analysis.applicable_laws:
-        formatted_response += f"- {law}\n"
-    formatted_response += f"""
-### Key Legal Principles
-"""
-    for principle in legal_analysis.key_principles:
-        formatted_response += f"- {principle}\n"
-    formatted_response += f"""
-### Practical Implications
-{legal_analysis.practical_implications}
+# Format response for display; accepts a LegalAnalysis or a partially streamed dict of one
+def format_response_for_display(legal_analysis):
+    if isinstance(legal_analysis, BaseModel):
+        legal_analysis = legal_analysis.model_dump()
+    parts = []
+    if legal_analysis.get("query_summary"):
+        parts.append(f"\n### Query Summary\n{legal_analysis['query_summary']}\n")
+    if legal_analysis.get("applicable_laws"):
+        parts.append("\n### Applicable Laws\n")
+        parts.extend(f"- {law}\n" for law in legal_analysis["applicable_laws"])
+    if legal_analysis.get("key_principles"):
+        parts.append("\n### Key Legal Principles\n")
+        parts.extend(f"- {principle}\n" for principle in legal_analysis["key_principles"])
+    if legal_analysis.get("practical_implications"):
+        parts.append(f"\n### Practical Implications\n{legal_analysis['practical_implications']}\n")
+    if "references" in legal_analysis:
+        parts.append("\n### Legal References\n")
+    for ref in legal_analysis.get("references") or []:
+        if not isinstance(ref, dict):
+            continue
+        parts.append(f"\n**{ref.get('title', '')}** _(Source: {ref.get('source', '')})_\n")
+        if ref.get("relevance"):
+            parts.append(f"- Relevance: {ref['relevance']}\n")
+        parts.append("- Key Points:\n")
+        parts.extend(f"  - {point}\n" for point in ref.get("key_points") or [])
+        if ref.get("citation"):
+            parts.append(f"- Citation: {ref['citation']}\n")
+    return "".join(parts)
 
-### Legal References
-"""
-    for ref in legal_analysis.references:
-        formatted_response += f"""
-**{ref.title}** _(Source: {ref.source})_
-- Relevance: {ref.relevance}
-- Key Points:
-"""
-        for point in ref.key_points:
-            formatted_response += f"  - {point}\n"
-        if ref.citation:
-            formatted_response += f"- Citation: {ref.citation}\n"
-    return formatted_response
+# Response timing label; streamed answers also show time to first token, and
+# answers backed by Kanoon data show the estimated context tokens sent
+def format_timing(message):
+    label = f"⏱ {message.get('response_time', 0.0):.1f}s"
+    if message.get("first_token_time") is not None:
+        label = f"⚡ {message['first_token_time']:.1f}s first token | {label}"
+    if message.get("context_tokens") is not None:
+        label = f"{label} | 📄 {message['context_tokens']} context tokens"
+    return label
 
 # Display messages with animations
 def display_messages():
@@ -339,7 +377,7 @@ def display_messages():
                 <div class="assistant-message">
                     {message["content"]}
                     <div style="font-size: 0.8em; color: #e9ecef; text-align: right; margin-top: 4px;">
-                        {message.get("timestamp", datetime.now().strftime("%H:%M"))} | ⏱ {message.get("response_time", 0.0):.1f}s
+                        {message.get("timestamp", datetime.now().strftime("%H:%M"))} | {format_timing(message)}
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -349,13 +387,21 @@ def process_user_input(user_input):
     timestamp = datetime.now().strftime("%H:%M")
     st.session_state.messages.append({"role": "user", "content": user_input, "timestamp": timestamp})
     is_legal_query = is_indian_law_related(user_input)
+    first_token_time = None
+    context_stats = None
     if not is_legal_query:
         response = "I can only answer questions related to Indian law. Please rephrase your query to focus on Indian legal matters."
         response_time = 0.0
     else:
         kanoon_data = fetch_indian_kanoon_data(user_input)
-        if kanoon_data:
-            legal_analysis, response_time = process_legal_query(user_input, kanoon_data)
+        if kanoon_data and st.session_state.stream_answers:
+            with st.chat_message("assistant", avatar="⚖"):
+                placeholder = st.empty()
+                placeholder.markdown("_Analyzing..._")
+                legal_analysis, first_token_time, response_time, context_stats = stream_legal_query(user_input, kanoon_data, placeholder)
+            response = format_response_for_display(legal_analysis)
+        elif kanoon_data:
+            legal_analysis, response_time, context_stats = process_legal_query(user_input, kanoon_data)
             response = format_response_for_display(legal_analysis)
         else:
             response = "Sorry, I couldn't find relevant legal information for your query. Please try rephrasing your question with more specific legal terms or references."
@@ -364,19 +410,23 @@ def process_user_input(user_input):
         "role": "assistant", 
         "content": response, 
         "timestamp": datetime.now().strftime("%H:%M"),
-        "response_time": response_time
+        "response_time": response_time,
+        "first_token_time": first_token_time,
+        "context_tokens": context_stats["tokens"] if context_stats else None
     })
     st.session_state.response_time = response_time
 
  
 def main():
+    chains.warm_up()
+    auth_cookie.require_login(st.session_state)
     init_session_state()
     with st.sidebar:
         st.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
         if st.button("Logout"):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
+            auth_cookie.sign_out(st.session_state)
             st.switch_page("account.py")
+        st.toggle("Stream answers", key="stream_answers")
         st.markdown("""
         ### About Kanoon ki Pehchaan
         *Kanoon ki Pehchaan* is an AI-powered legal assistant for Indian law.
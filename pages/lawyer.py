@@ -1,9 +1,10 @@
 import streamlit as st
 from dotenv import load_dotenv
-import os
-import mysql.connector
 import getpass
 from PIL import Image
+import lawyers
+import thumbnails
+import auth_cookie
 
 load_dotenv()
 
@@ -14,14 +15,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="0819",
-        database="lawyers"
-    )
-
 def local_css():
     st.markdown("""
     <style>
@@ -94,6 +87,7 @@ def local_css():
 
 local_css()
 
+auth_cookie.require_login(st.session_state)
 username = st.session_state.get('username', getpass.getuser())
 st.markdown('<div class="main-header">', unsafe_allow_html=True)
 st.markdown('<div class="flag-stripe"></div>', unsafe_allow_html=True)
@@ -104,26 +98,18 @@ st.markdown("""
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.7.2/css/all.min.css" integrity="sha512-Evv84Mr4kqVGRNSgIGL/F/aIDqQb7xQ2vcrdIwxfjThSH8CSR7PBEakCr51Ck+w+/U6swU2Im1vVX0SVk9ABhg==" crossorigin="anonymous" referrerpolicy="no-referrer" />
 """, unsafe_allow_html=True)
 
-conn = get_db_connection()
-cursor = conn.cursor(dictionary=True)
-cursor.execute("SELECT profile_pic_url FROM users WHERE name = %s", (username,))
-users = cursor.fetchall()
-cursor.close()
-conn.close()
+# Profile and picture metadata in one cached load, memoized for this session
+profile = lawyers.load_profile(username, memo=st.session_state.setdefault("profiles", {}))
+users = [profile] if profile else []
 
 st.markdown('<div class="card animate-fadeIn">', unsafe_allow_html=True)
 for user in users:
-    if os.path.exists(user["profile_pic_url"]):
-        st.image(user["profile_pic_url"], width=150, caption="Profile Picture")
+    picture = thumbnails.thumbnail_bytes(user["picture"], width=150)
+    if picture:
+        st.image(picture, width=150, caption="Profile Picture")
     st.markdown("---")
 
 st.header("Your Profile")
-conn = get_db_connection()
-cursor = conn.cursor(dictionary=True)
-cursor.execute("SELECT * FROM users WHERE name = %s", (username,))
-users = cursor.fetchall()
-cursor.close()
-conn.close()
 
 for user in users:
     st.subheader(user["name"])
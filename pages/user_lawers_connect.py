@@ -7,7 +7,9 @@ from dotenv import load_dotenv
 import os
 import logging
 from pathlib import Path
-import mysql.connector
+import lawyers
+import lawyer_match
+import thumbnails
 
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -44,14 +46,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="0819",
-        database="lawyers"
-    )
-
 def local_css():
     st.markdown("""
     <style>
@@ -143,27 +137,67 @@ st.markdown('</div>', unsafe_allow_html=True)
 
 st.markdown('<div class="card animate-fadeIn">', unsafe_allow_html=True)
 case_details = st.text_area("Enter your case details")
-conn = get_db_connection()
-cursor = conn.cursor(dictionary=True)
-cursor.execute("SELECT * FROM users")
-users = cursor.fetchall()
-cursor.close()
-conn.close()
+
+# How many of the best matching lawyers a case description can list
+LAWYER_MATCH_LIMIT = int(os.getenv("LAWYER_MATCH_LIMIT", "100"))
+
+# The directory is fetched a page at a time, and only after Submit. With case details the
+# lawyers are ranked first and pages are slices of the ranking; without, pages follow name order.
+if "directory" not in st.session_state:
+    st.session_state.directory = None
+
+def load_directory_page():
+    directory = st.session_state.directory
+    if directory["matches"] is not None:
+        # Offset into the ranking, not len(rows): a matched name may have no profile row
+        # (e.g. deleted since the index was built), and must not shift the next page back
+        start = directory["match_offset"]
+        names = [name for _, name in directory["matches"][start:start + lawyers.LAWYER_PAGE_SIZE]]
+        directory["rows"].extend(lawyers.profiles(names))
+        directory["match_offset"] = start + len(names)
+        directory["done"] = directory["match_offset"] >= len(directory["matches"])
+        return
+    rows, cursor = lawyers.directory_page(after=directory["cursor"])
+    directory["rows"].extend(rows)
+    directory["cursor"] = cursor
+    directory["done"] = cursor is None
+
+def show_lawyer(user):
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        picture = thumbnails.thumbnail_bytes(user["profile_pic_url"], width=150)
+        if picture:
+            st.image(picture, width=150, caption="Profile Picture")
+    with col2:
+        st.text(f"Name: {user['name']}")
+        st.text(f"Degree: {user['degree']}")
+        st.text(f"College: {user['college']}")
+        st.text(f"Qualifications: {user['myQualifications']}")
+        st.text(f"Phone Number: {user['Phone_No']}")
+        st.text(f"Social Media: {user['social_media']}")
+        st.markdown("---")
 
 if st.button("Submit"):
-    st.subheader("Here is a list of lawyers for you:")
-    for user in users:
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            if os.path.exists(user["profile_pic_url"]):
-                st.image(user["profile_pic_url"], width=150, caption="Profile Picture")
-        with col2:
-            st.text(f"Name: {user['name']}")
-            st.text(f"Degree: {user['degree']}")
-            st.text(f"College: {user['college']}")
-            st.text(f"Qualifications: {user['myQualifications']}")
-            st.text(f"Phone Number: {user['Phone_No']}")
-            st.text(f"Social Media: {user['social_media']}")
-            st.markdown("---")
+    matches = None
+    if case_details.strip():
+        matches = lawyer_match.get_index().top(case_details, k=LAWYER_MATCH_LIMIT)
+    st.session_state.directory = {"rows": [], "cursor": None, "done": False, "matches": matches, "match_offset": 0}
+    load_directory_page()
+
+directory = st.session_state.directory
+if directory is not None:
+    if directory["matches"] is not None:
+        st.subheader("Lawyers best suited to your case:")
+    else:
+        st.subheader("Here is a list of lawyers for you:")
+    for user in directory["rows"]:
+        show_lawyer(user)
+    if not directory["rows"]:
+        if directory["matches"] is not None:
+            st.info("No lawyer profiles match your case details yet. Submit without details to browse all lawyers.")
+        else:
+            st.info("No lawyers found.")
+    if not directory["done"]:
+        st.button("Load more", on_click=load_directory_page)
 st.markdown('</div>', unsafe_allow_html=True)
 st.markdown('<div class="footer">Connect with Lawyers</div>', unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import html
+import json
+import re
+import numpy as np
+from collections import defaultdict
+from ikapi import canonical_text, legal_tokens
+
+_BLOCK_TAGS = re.compile(r"(?i)</?(?:p|div|br|blockquote|pre|h[1-6]|li|tr|table)[^>]*>")
+_TAGS = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+_SENTENCE_END = re.compile(r"(?<=[.;:?!])\s+")
+
+
+# Plain text of an Indian Kanoon /doc/ response: the HTML "doc" field with markup removed
+def document_text(content):
+    try:
+        payload = json.loads(content)
+        if isinstance(payload, dict) and payload.get("doc"):
+            content = payload["doc"]
+    except (ValueError, TypeError):
+        pass
+    text = _BLOCK_TAGS.sub("\n\n", content)
+    text = html.unescape(_TAGS.sub("", text))
+    return text.replace("\x00", "")
+
+
+# Paragraphs of roughly min_chars..max_chars; short ones are merged, long ones split at sentence ends
+def split_passages(text, min_chars=200, max_chars=1000):
+    passages, current = [], ""
+    for block in _BLANK_LINES.split(text):
+        block = " ".join(block.split())
+        if not block:
+            continue
+        pieces = [block]
+        if len(block) > max_chars:
+            pieces, piece = [], ""
+            for sentence in _SENTENCE_END.split(block):
+                if piece and len(piece) + len(sentence) + 1 > max_chars:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece} {sentence}" if piece else sentence
+                while len(piece) > max_chars:
+                    pieces.append(piece[:max_chars])
+                    piece = piece[max_chars:]
+            if piece:
+                pieces.append(piece)
+        for piece in pieces:
+            current = f"{current}\n{piece}" if current else piece
+            if len(current) >= min_chars:
+                passages.append(current)
+                current = ""
+    if current:
+        passages.append(current)
+    return passages
+
+
+# BM25 index over the passages of one document. Tokens are stored as flat term/passage id
+# arrays so scoring a query is a handful of NumPy bincounts regardless of document length.
+class PassageIndex:
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        # Canonicalize the whole document in one pass; NUL never occurs in text and survives it
+        canonical = canonical_text("\x00".join(passages)).split("\x00")
+        tokens = [legal_tokens(passage, canonical=True) for passage in canonical]
+        vocabulary = defaultdict()
+        vocabulary.default_factory = vocabulary.__len__
+        self.term_ids = np.fromiter(
+            (vocabulary[token] for passage in tokens for token in passage), dtype=np.int32
+        )
+        self.lengths = np.fromiter((len(passage) for passage in tokens), dtype=np.float32, count=len(tokens))
+        self.passage_ids = np.repeat(np.arange(len(tokens), dtype=np.int32), self.lengths.astype(np.int64))
+        self.vocabulary = dict(vocabulary)
+        self.avg_length = float(self.lengths.mean()) if len(passages) else 0.0
+
+    @classmethod
+    def from_document(cls, content, **kwargs):
+        return cls(split_passages(document_text(content)), **kwargs)
+
+    def scores(self, query):
+        n = len(self.passages)
+        scores = np.zeros(n, dtype=np.float32)
+        if not n or not self.avg_length:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / self.avg_length)
+        for token in set(legal_tokens(query)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            tf = np.bincount(self.passage_ids[self.term_ids == term], minlength=n).astype(np.float32)
+            df = np.count_nonzero(tf)
+            idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    # Best (score, passage_index) pairs, highest score first
+    def top(self, query, k=5):
+        scores = self.scores(query)
+        if not len(scores):
+            return []
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(float(scores[i]), int(i)) for i in order]
@@ -0,0 +1,85 @@
+import concurrent.futures
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import List
+import PyPDF2
+from memory_cache import TTLCache
+
+# Documents with at least this many pages are split into page ranges across a process pool
+PDF_PARALLEL_PAGES = int(os.getenv("PDF_PARALLEL_PAGES", "40"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_cache = TTLCache(maxsize=int(os.getenv("PDF_EXTRACT_CACHE_SIZE", "32")))
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@dataclass
+class PdfExtraction:
+    sha256: str
+    text: str
+    page_count: int
+    page_seconds: List[float] = field(default_factory=list)
+    total_seconds: float = 0.0
+    cached: bool = False
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned rather than forked: the Streamlit server process is heavily threaded
+            _executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=PDF_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+# Text and extraction time of pages [start, stop); runs in worker processes, so it reopens the PDF
+def _extract_range(data, start, stop):
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    results = []
+    for page in reader.pages[start:stop]:
+        page_start = time.perf_counter()
+        results.append((page.extract_text() or "", time.perf_counter() - page_start))
+    return results
+
+
+# Extract the text of a PDF given its bytes. Results are cached by content hash, so reruns and
+# re-uploads of the same file skip parsing; large files are extracted page-range-parallel.
+def extract_pdf(data, parallel_pages=PDF_PARALLEL_PAGES, workers=PDF_EXTRACT_WORKERS):
+    digest = hashlib.sha256(data).hexdigest()
+    cached = _cache.get(digest)
+    if cached is not None:
+        return replace(cached, cached=True)
+
+    start = time.perf_counter()
+    page_count = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+    if page_count >= parallel_pages and workers > 1:
+        step = -(-page_count // workers)
+        ranges = [(i, min(i + step, page_count)) for i in range(0, page_count, step)]
+        executor = _get_executor()
+        pages = []
+        for part in executor.map(_extract_range, [data] * len(ranges), *zip(*ranges)):
+            pages.extend(part)
+    else:
+        pages = _extract_range(data, 0, page_count)
+
+    extraction = PdfExtraction(
+        sha256=digest,
+        text="".join(text for text, _ in pages),
+        page_count=page_count,
+        page_seconds=[seconds for _, seconds in pages],
+        total_seconds=time.perf_counter() - start,
+    )
+    _cache.set(digest, extraction)
+    return extraction
+
+
+def cache_stats():
+    return _cache.stats()
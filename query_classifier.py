@@ -0,0 +1,40 @@
+import re
+
+# Whole-word legal vocabulary. Matching is by word, so "act" no longer matches "contact"
+# and "case" no longer matches "showcase"; "section 302" style references match on "section".
+# Derived forms are listed out ("unlawfully", "enactments") rather than matched by prefix, so one
+# set lookup per query stays the only check and short words like "law" never match "lawn".
+LEGAL_TERMS = frozenset("""
+    india indian indians bharat bharatiya constitution constitutional statute statutes statutory
+    law laws lawful lawfully unlawful unlawfully lawsuit lawsuits lawmaker lawmakers
+    legal legally legality illegal illegally legislation legislative legislature
+    enact enacted enactment enactments act acts section sections article articles
+    court courts judge judges judgment judgments judgement judgements judicial judiciary
+    jurisdiction magistrate magistrates tribunal tribunals
+    lawyer lawyers advocate advocates advocacy litigation litigant litigants
+    case cases petition petitions affidavit affidavits summons
+    police fir chargesheet arrest arrested warrant warrants bail bailable accused
+    crime crimes criminal offence offences offense offenses prosecution dowry harassment defamation
+    complaint complaints tenant tenants tenancy landlord landlords evict evicted eviction
+    divorce divorced custody alimony
+    ipc crpc cpc bns bnss
+""".split())
+
+# Dots are dropped before splitting so "I.P.C." and "Cr.P.C." read as "ipc" and "crpc"
+_WORDS = re.compile(r"[a-z]+")
+
+
+# Check if query is related to Indian law: one regex pass to split words, then set lookups
+def is_indian_law_related(query):
+    if not query or not isinstance(query, str):
+        return False
+    return not LEGAL_TERMS.isdisjoint(_WORDS.findall(query.lower().replace(".", "")))
+
+
+# Classify many queries at once, e.g. when replaying chat logs
+def classify_batch(queries):
+    findall, is_disjoint = _WORDS.findall, LEGAL_TERMS.isdisjoint
+    return [
+        isinstance(query, str) and bool(query) and not is_disjoint(findall(query.lower().replace(".", "")))
+        for query in queries
+    ]
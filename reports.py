@@ -0,0 +1,75 @@
+import concurrent.futures
+import hashlib
+import io
+import os
+import threading
+from datetime import datetime
+from fpdf import FPDF
+from docx import Document
+from memory_cache import TTLCache
+
+# Function to convert JSON to text format
+def json_to_text(analysis):
+    """
+    Convert the structured JSON analysis into a simple text format.
+    """
+    parts = ["=== Summary ===\n", f"{analysis.summary.summary}\n\n", "=== Key Points ===\n"]
+    parts.extend(f"{i}. {key_point.point}\n" for i, key_point in enumerate(analysis.key_points, start=1))
+    return "".join(parts)
+
+# Function to create a PDF report from the analysis
+def create_pdf_report(analysis):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Helvetica', '', 12)
+    pdf.cell(200, 10, txt="PDF Analysis Report", ln=True, align='C')
+    pdf.cell(200, 10, txt=f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
+    
+    # Convert JSON to text
+    clean_text = json_to_text(analysis)
+    pdf.multi_cell(0, 10, txt=clean_text)
+    return pdf.output(dest='S')  # Return PDF as bytes
+
+# Function to create a Word report from the analysis
+def create_word_report(analysis):
+    doc = Document()
+    doc.add_heading('PDF Analysis Report', 0)
+    doc.add_paragraph(f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+    
+    # Convert JSON to text
+    clean_text = json_to_text(analysis)
+    doc.add_heading('Analysis', level=1)
+    doc.add_paragraph(clean_text)
+    
+    docx_bytes = io.BytesIO()
+    doc.save(docx_bytes)
+    docx_bytes.seek(0)
+    return docx_bytes.getvalue()
+
+# Report formats: builder, download file name and MIME type
+REPORT_FORMATS = {
+    "pdf": (create_pdf_report, "analysis_report.pdf", "application/pdf"),
+    "docx": (create_word_report, "analysis_report.docx",
+             "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+}
+
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("REPORT_WORKERS", "2")), thread_name_prefix="reports"
+)
+_reports = TTLCache(maxsize=int(os.getenv("REPORT_CACHE_SIZE", "64")))
+_lock = threading.Lock()
+
+def analysis_hash(analysis):
+    return hashlib.sha256(analysis.model_dump_json().encode("utf8")).hexdigest()
+
+# Start building one report format in the background, or return the job already started for
+# the same analysis and format. The returned future resolves to the report bytes.
+def request_report(analysis, report_format):
+    key = (analysis_hash(analysis), report_format)
+    with _lock:
+        future = _reports.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            builder = REPORT_FORMATS[report_format][0]
+            future = _executor.submit(builder, analysis)
+            _reports.set(key, future)
+    return future
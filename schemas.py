@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Pydantic models for structured output of the legal assistant (pages/home.py)
+class LegalReference(BaseModel):
+    title: str = Field(description="Title of the legal document or case")
+    source: str = Field(description="Source of the document (court, statute, etc.)")
+    relevance: str = Field(description="Explanation of how this reference relates to the query")
+    key_points: List[str] = Field(description="Main legal points from this reference")
+    citation: Optional[str] = Field(None, description="Formal legal citation if available")
+
+class LegalAnalysis(BaseModel):
+    query_summary: str = Field(description="Concise summary of the legal question")
+    applicable_laws: List[str] = Field(description="List of applicable laws and sections")
+    key_principles: List[str] = Field(description="Key legal principles relevant to the query")
+    practical_implications: str = Field(description="Practical implications for the person asking")
+    references: List[LegalReference] = Field(description="Detailed references to relevant cases and statutes")
+
+# Pydantic models for structured output of the document analyzer (pages/docs.py)
+class KeyPoint(BaseModel):
+    point: str = Field(description="A key point extracted from the document.")
+
+class Summary(BaseModel):
+    summary: str = Field(description="A brief summary of the document content.")
+
+class DocumentAnalysis(BaseModel):
+    key_points: List[KeyPoint] = Field(description="List of key points from the document.")
+    summary: Summary = Field(description="Summary of the document.")
@@ -0,0 +1,122 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from PIL import Image, ImageOps, features
+from memory_cache import TTLCache
+
+THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", os.path.join("images", "thumbs"))
+# Square bounding boxes, in pixels; pages show 150 px images, the larger sizes cover HiDPI screens
+THUMBNAIL_SIZES = (150, 300, 600)
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+# Uploads larger than this are refused before decoding
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024
+
+FORMAT, EXTENSION = ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+_THUMBNAIL_NAME = re.compile(r"^([0-9a-f]{32})_(\d+)\.(?:webp|jpg)$")
+
+_bytes = TTLCache(maxsize=int(os.getenv("THUMBNAIL_CACHE_SIZE", "512")))
+# Pictures saved before thumbnails existed, by (path, mtime) -> content hash
+_legacy = TTLCache(maxsize=1024)
+_lock = threading.Lock()
+
+
+def thumbnail_path(digest, size):
+    return os.path.join(THUMBNAIL_DIR, f"{digest}_{size}.{EXTENSION}")
+
+
+# Decode an uploaded image once and write a thumbnail per size, named by the hash of the
+# upload so identical pictures share files and a new picture never reuses a stale name.
+# Returns the path of the largest thumbnail, which is what a profile stores.
+def process_image(data):
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise ValueError(f"image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    largest = thumbnail_path(digest, THUMBNAIL_SIZES[-1])
+    if all(os.path.exists(thumbnail_path(digest, size)) for size in THUMBNAIL_SIZES):
+        return largest
+
+    image = Image.open(io.BytesIO(data))
+    # JPEGs can be decoded straight at a reduced scale, which is most of the cost for phone photos
+    image.draft("RGB", (THUMBNAIL_SIZES[-1], THUMBNAIL_SIZES[-1]))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA") or (image.mode == "RGBA" and FORMAT == "JPEG"):
+        image = image.convert("RGB")
+
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    # Largest first, each size resampled from the previous one
+    for size in sorted(THUMBNAIL_SIZES, reverse=True):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        if FORMAT == "WEBP":
+            image.save(buffer, FORMAT, quality=THUMBNAIL_QUALITY, method=4)
+        else:
+            image.save(buffer, FORMAT, quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+        path = thumbnail_path(digest, size)
+        # Write then rename so a page never reads a half-written thumbnail
+        with open(path + ".tmp", "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(path + ".tmp", path)
+        _bytes.set((digest, size), buffer.getvalue())
+    return largest
+
+
+# Content hash behind a stored picture path: read from thumbnail names, and for pictures saved
+# before thumbnails existed, computed once (thumbnails are generated on first view)
+def _digest(path):
+    match = _THUMBNAIL_NAME.match(os.path.basename(path))
+    if match:
+        return match.group(1)
+    if not os.path.exists(path):
+        return None
+    key = (path, os.path.getmtime(path))
+    digest = _legacy.get(key)
+    if digest is None:
+        with open(path, "rb") as f:
+            data = f.read()
+        with _lock:
+            process_image(data)
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        _legacy.set(key, digest)
+    return digest
+
+
+# What a page needs to show a stored picture without touching the filesystem again:
+# its content hash and thumbnail sizes. None when there is no usable picture.
+def picture_info(path):
+    if not path:
+        return None
+    try:
+        digest = _digest(path)
+    except (OSError, ValueError, Image.UnidentifiedImageError):
+        return None
+    if digest is None:
+        return None
+    return {"path": path, "digest": digest, "sizes": THUMBNAIL_SIZES, "format": EXTENSION}
+
+
+# Bytes of the smallest thumbnail at least `width` pixels wide (twice that on HiDPI pages),
+# served from memory after the first read. Takes a stored picture path or picture_info().
+# None when the profile has no usable picture.
+def thumbnail_bytes(picture, width=150, scale=2):
+    if not isinstance(picture, dict):
+        picture = picture_info(picture)
+    if picture is None:
+        return None
+    digest = picture["digest"]
+    size = next((size for size in THUMBNAIL_SIZES if size >= width * scale), THUMBNAIL_SIZES[-1])
+    data = _bytes.get((digest, size))
+    if data is None:
+        try:
+            with open(thumbnail_path(digest, size), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        _bytes.set((digest, size), data)
+    return data
+
+
+def cache_stats():
+    return _bytes.stats()